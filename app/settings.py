@@ -1,16 +1,19 @@
-import os
 from pathlib import Path
 
 import environ
-from celery.schedules import crontab
 
 # Environment
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-environ.Env.read_env(BASE_DIR / ".env")
+# Parse the .env file only once per process, even if settings are re-imported
+if not getattr(environ.Env, "_mapster_env_loaded", False):
+    environ.Env.read_env(BASE_DIR / ".env")
+    environ.Env._mapster_env_loaded = True
+
 env = environ.Env(
     DJANGO_SECRET_KEY=(str, ""),
     TELEGRAM_TOKEN=(str, ""),
+    TELEGRAM_WEBHOOK_SECRET=(str, ""),
     GOOGLE_MAP_API=(str, ""),
 
     DB_NAME=(str, ""),
@@ -24,18 +27,28 @@ env = environ.Env(
 
     CELERY_BROKER_URL=(str,""),
     CELERY_RESULT_BACKEND=(str, ""),
+
+    REDIS_CACHE_URL=(str, ""),
 )
 SECRET_KEY = env("DJANGO_SECRET_KEY")
 
 DEBUG = env.bool("DEBUG", default=False)
 
+ENABLE_API_SCHEMA = DEBUG or env.bool("ENABLE_API_SCHEMA", default=False)
+
+# Disable when static files are served by a reverse proxy
+SERVE_STATIC = env.bool("SERVE_STATIC", default=True)
+
+BACK_URL = env("BACK_URL")
+FRONT_URL = env("FRONT_URL")
+
 ALLOWED_HOSTS = [
     "localhost",
     "127.0.0.1",
-    env("BACK_URL")
+    BACK_URL
 ]
 
-DOMAIN_URL = "https://" + env("BACK_URL")
+DOMAIN_URL = "https://" + BACK_URL
 
 # Application definition
 INSTALLED_APPS = [
@@ -48,7 +61,6 @@ INSTALLED_APPS = [
     'django_celery_beat',
     'rest_framework',
     'rest_framework.authtoken',
-    'drf_spectacular',
 
     # CORE
     'django.contrib.admin',
@@ -59,9 +71,12 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 ]
 
+# OpenAPI schema endpoints are only served in debug or when explicitly enabled
+if ENABLE_API_SCHEMA:
+    INSTALLED_APPS.append('drf_spectacular')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,6 +86,9 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if SERVE_STATIC:
+    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -136,7 +154,35 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+}
+# WhiteNoise resolves static URLs from the collectstatic manifest only, never by scanning the finders.
+# Behind a proxy that serves the files itself, plain URLs are used, so a missing manifest entry is no 500
+if SERVE_STATIC:
+    STORAGES["staticfiles"]["BACKEND"] = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+    WHITENOISE_USE_FINDERS = False
+    WHITENOISE_MANIFEST_STRICT = True
+
+# Cache (shared by throttling across workers), falls back to per-process memory
+if env("REDIS_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env("REDIS_CACHE_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -152,23 +198,32 @@ CELERY_RESULT_BACKEND = env("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "UTC"
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
-CELERY_BEAT_SCHEDULE = {
-    # Reset daily moves every day at midnight:
-    'reset-daily-moves-at-midnight': {
-        'task': 'users.tasks.reset_daily_moves',
-        'schedule': crontab(minute=0, hour=0),
-    },
-    # Check and send feedback answers every hour:
-    'send-feedback-answers': {
-        'task': 'core.tasks.send_feedback_answer',
-        'schedule': crontab(minute=0),
+# The schedule is only needed to seed the database scheduler, so it is built
+# in the beat process only
+if env.bool("CELERY_BEAT_SEED", default=False):
+    from celery.schedules import crontab
+
+    CELERY_BEAT_SCHEDULE = {
+        # Reset daily moves every day at midnight:
+        'reset-daily-moves-at-midnight': {
+            'task': 'users.tasks.reset_daily_moves',
+            'schedule': crontab(minute=0, hour=0),
+        },
+        # Check and send feedback answers every hour:
+        'send-feedback-answers': {
+            'task': 'core.tasks.send_feedback_answer',
+            'schedule': crontab(minute=0),
+        },
+        # Retry countries of locations whose geocoding failed every hour:
+        'resolve-missing-countries': {
+            'task': 'core.tasks.resolve_missing_countries',
+            'schedule': crontab(minute=30),
+        },
     }
-}
 
 # Logging
-LOG_DIR = os.path.join(BASE_DIR, 'logs')
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+LOG_DIR = BASE_DIR / 'logs'
+LOG_DIR.mkdir(exist_ok=True)
 
 LOGGING = {
     'version': 1,
@@ -183,7 +238,7 @@ LOGGING = {
         'file_general': {
             'level': 'INFO',
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': os.path.join(LOG_DIR, 'general.log'),
+            'filename': LOG_DIR / 'general.log',
             'maxBytes': 1024*1024*5,
             'backupCount': 5,
             'formatter': 'verbose',
@@ -192,26 +247,33 @@ LOGGING = {
         'file_errors': {
             'level': 'ERROR',
             'class': 'logging.handlers.RotatingFileHandler',
-            'filename': os.path.join(LOG_DIR, 'errors.log'),
+            'filename': LOG_DIR / 'errors.log',
             'maxBytes': 1024*1024*5,
             'backupCount': 5,
             'formatter': 'verbose',
             'encoding': 'utf-8',
         },
+        # Request threads only enqueue records, file handlers are run by a
+        # QueueListener started in every process by core.apps.start_log_listener()
+        'queue': {
+            'class': 'logging.handlers.QueueHandler',
+            'handlers': ['file_general', 'file_errors'],
+            'respect_handler_level': True,
+        },
     },
     'loggers': {
         'django': {
-            'handlers': ['file_general', 'file_errors'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
         'core': {
-            'handlers': ['file_general', 'file_errors'],
+            'handlers': ['queue'],
             'level': 'DEBUG',
             'propagate': False,
         },
         'users': {
-            'handlers': ['file_general', 'file_errors'],
+            'handlers': ['queue'],
             'level': 'DEBUG',
             'propagate': False,
         },
@@ -233,9 +295,12 @@ REST_FRAMEWORK = {
     "DEFAULT_THROTTLE_RATES": {
         "user": "60/min",
     },
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# The schema generator is only loaded together with the schema endpoints
+if ENABLE_API_SCHEMA:
+    REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = 'drf_spectacular.openapi.AutoSchema'
+
 # SECURITY
 SECURE_BROWSER_XSS_FILTER = True
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -243,12 +308,12 @@ SECURE_REFERRER_POLICY = "strict-origin-when-cross-origin"
 
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOW_CREDENTIALS = True
-CORS_ALLOWED_ORIGINS = [
+CORS_ALLOWED_ORIGINS = (
     "http://localhost:3000",
     "https://web.telegram.org",
-    "https://" + env("BACK_URL"),
-    "https://" + env("FRONT_URL"),
-]
+    DOMAIN_URL,
+    "https://" + FRONT_URL,
+)
 CORS_ALLOW_HEADERS = [
     'accept',
     'accept-encoding',
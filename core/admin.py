@@ -1,17 +1,35 @@
 from django.contrib import admin
+from django.db import transaction
+from django.db.models import CharField, Count, F, Sum, Value
+from django.db.models.functions import Concat
 
-from .models import Feedback, GameResult, Location, Rating
+from users.models import TelegramUser
+
+from .models import Feedback, GameResult, Location, Rating, subtract_total
 
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
     list_display = ('id', 'location', 'country', 'street_view_url', 'created_at', 'total_guesses', 'avg_error')
-    list_filter = ('id', 'created_at', 'country', 'total_guesses', 'avg_error')
+    list_filter = ('created_at', 'country', 'complexity')
+    actions = ('recompute_stats',)
+
+    def get_queryset(self, request):
+        # Format coordinates in the database instead of per changelist row
+        return super().get_queryset(request).annotate(
+            _location=Concat(Value('('), F('lat'), Value(', '), F('lng'), Value(')'), output_field=CharField())
+        )
 
     def location(self, obj):
-        return f"({obj.lat}, {obj.lng})"
+        return obj._location
 
     location.short_description = 'Location'
+    location.admin_order_field = '_location'
+
+    @admin.action(description='Recompute statistics')
+    def recompute_stats(self, request, queryset):
+        count = Location.recompute_stats(queryset)
+        self.message_user(request, f'Statistics were recomputed for {count} locations.')
 
     def get_fields(self, request, obj=None):
         if obj is None:
@@ -22,10 +40,14 @@ class LocationAdmin(admin.ModelAdmin):
 @admin.register(GameResult)
 class GuessAdmin(admin.ModelAdmin):
     list_display = ('id', 'score', 'user_id', 'location', 'distance_error', 'duration', 'guessed_at')
-    list_filter = ('id', 'score', 'user_id', 'location', 'distance_error', 'duration', 'guessed_at')
+    list_filter = ('guessed_at',)
+
+    def get_queryset(self, request):
+        # The change form shows the user and location, so load them with the game
+        return super().get_queryset(request).select_related('user', 'location')
 
     def user_id(self, obj):
-        return f"{obj.user.id}"
+        return f"{obj.user_id}"
     user_id.short_description = 'User'
 
     def get_fields(self, request, obj=None):
@@ -34,8 +56,46 @@ class GuessAdmin(admin.ModelAdmin):
         return super().get_fields(request, obj)
 
     def delete_queryset(self, request, queryset):
-        for obj in queryset:
-            obj.delete()
+        """
+        Deletes selected games with a single DELETE and reverts the stats of affected
+        users and locations with one UPDATE per user/location instead of per game.
+
+        Only games already added to their location stats are subtracted from them.
+        """
+        totals = {
+            'count': Count('id'),
+            'errors': Sum('distance_error'),
+            'time': Sum('duration'),
+            'moves': Sum('moves_used'),
+            'score': Sum('score'),
+        }
+        with transaction.atomic():
+            # Locked rows cannot be claimed by a running apply_location_stats task until they are deleted
+            list(queryset.select_for_update(of=('self',)).values_list('id', flat=True))
+            user_totals = list(queryset.order_by().values('user_id').annotate(**totals))
+            location_totals = list(
+                queryset.filter(location_stats_applied=True).order_by().values('location_id').annotate(**totals)
+            )
+            queryset.delete()
+
+            for row in user_totals:
+                TelegramUser.objects.filter(id=row['user_id']).update(
+                    games=F('games') - row['count'],
+                    total_errors=subtract_total('games', row['count'], 'total_errors', row['errors']),
+                    total_time=F('total_time') - row['time'],
+                    total_moves=F('total_moves') - row['moves'],
+                    total_score=subtract_total('games', row['count'], 'total_score', row['score']),
+                    daily_moves_remaining=F('daily_moves_remaining') + row['moves'],
+                )
+
+            for row in location_totals:
+                Location.objects.filter(id=row['location_id']).update(
+                    total_guesses=F('total_guesses') - row['count'],
+                    total_errors=subtract_total('total_guesses', row['count'], 'total_errors', row['errors']),
+                    total_time=F('total_time') - row['time'],
+                    total_moves=F('total_moves') - row['moves'],
+                    total_score=subtract_total('total_guesses', row['count'], 'total_score', row['score']),
+                )
 
 
 @admin.register(Rating)
@@ -46,8 +106,8 @@ class RatingAdmin(admin.ModelAdmin):
 @admin.register(Feedback)
 class FeedbackAdmin(admin.ModelAdmin):
     list_display = ('user_id', 'feedback_text', 'created_at', 'answered', 'answer', 'answered_at')
-    list_filter = ('user_id', 'feedback_text', 'created_at', 'answered', 'answer', 'answered_at')
+    list_filter = ('created_at', 'answered', 'answered_at')
 
     def user_id(self, obj):
-        return f"{obj.user.id}"
+        return f"{obj.user_id}"
     user_id.short_description = 'User'
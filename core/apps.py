@@ -1,6 +1,40 @@
+import atexit
+import logging
+import os
+from logging.handlers import QueueListener
+
 from django.apps import AppConfig
 
+_listener_pid = None
+
+
+def start_log_listener():
+    """
+    Starts writing queued log records to the file handlers in a background thread of the current process.
+
+    Forked workers (the Celery prefork pool, gunicorn with a preloaded app) inherit the queue handler
+    but not the listener thread, so each of them starts a listener of its own.
+    """
+    global _listener_pid
+    queue_handler = logging.getHandlerByName('queue')
+    if queue_handler is None or queue_handler.listener is None or _listener_pid == os.getpid():
+        return
+
+    if _listener_pid is not None:
+        # The inherited listener was started in the parent process, its thread does not exist here
+        listener = queue_handler.listener
+        queue_handler.listener = QueueListener(
+            listener.queue, *listener.handlers, respect_handler_level=listener.respect_handler_level
+        )
+
+    queue_handler.listener.start()
+    atexit.register(queue_handler.listener.stop)
+    _listener_pid = os.getpid()
+
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        start_log_listener()
@@ -5,6 +5,8 @@ from django.db import migrations, models
 
 class Migration(migrations.Migration):
 
+    atomic = True
+
     dependencies = [
         ('core', '0010_alter_guess_options_alter_location_options'),
     ]
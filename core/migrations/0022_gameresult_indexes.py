@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-15 22:01
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0021_feedback_sent_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='gameresult',
+            index=models.Index(fields=['-guessed_at'], name='core_gamere_guessed_82909e_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='gameresult',
+            index=models.Index(fields=['score'], name='core_gamere_score_ac91e3_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='gameresult',
+            index=models.Index(fields=['user', '-guessed_at'], name='core_gamere_user_id_381775_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-15 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_gameresult_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rating',
+            name='data_hash',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+    ]
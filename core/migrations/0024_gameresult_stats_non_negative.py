@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_rating_data_hash'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='gameresult',
+            constraint=models.CheckConstraint(condition=models.Q(('duration__gt', 0), ('distance_error__gte', 0), ('score__gte', 0), ('moves_used__gte', 0)), name='gameresult_stats_non_negative'),
+        ),
+    ]
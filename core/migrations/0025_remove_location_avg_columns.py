@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_gameresult_stats_non_negative'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='location',
+            name='avg_error',
+        ),
+        migrations.RemoveField(
+            model_name='location',
+            name='avg_moves',
+        ),
+        migrations.RemoveField(
+            model_name='location',
+            name='avg_score',
+        ),
+        migrations.RemoveField(
+            model_name='location',
+            name='avg_time',
+        ),
+    ]
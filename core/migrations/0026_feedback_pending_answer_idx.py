@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:40
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0025_remove_location_avg_columns'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='feedback',
+            index=models.Index(condition=models.Q(('answered', True), ('sent_at__isnull', True)), fields=['id'], name='feedback_pending_answer_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-16 00:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0026_feedback_pending_answer_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='location',
+            index=models.Index(fields=['complexity', 'id'], name='location_complexity_id_idx'),
+        ),
+    ]
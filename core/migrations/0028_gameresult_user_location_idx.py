@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-16 00:45
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0027_location_complexity_id_idx'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='gameresult',
+            index=models.Index(fields=['user', 'location'], name='gameresult_user_location_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-16 02:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_gameresult_user_location_idx'),
+    ]
+
+    operations = [
+        # Existing games are already part of their location stats
+        migrations.AddField(
+            model_name='gameresult',
+            name='location_stats_applied',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='gameresult',
+            name='location_stats_applied',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-16 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_gameresult_location_stats_applied'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='location',
+            name='total_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='feedback',
+            name='feedback_text',
+            field=models.TextField(),
+        ),
+    ]
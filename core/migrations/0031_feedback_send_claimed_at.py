@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_alter_location_total_score_feedback_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='feedback',
+            name='send_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
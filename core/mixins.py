@@ -2,10 +2,19 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+_SENTINEL = object()
+
 class AuthenticatedMixin:
     def get_user(self, request):
+        # Resolve the user once per request
+        cached = getattr(request, '_mapster_user', _SENTINEL)
+        if cached is not _SENTINEL:
+            return cached
+
         user = request.user
         if not user.is_authenticated:
-            logger.warning(f'Unauthorized access attempt from {request.META.get("REMOTE_ADDR")}')
-            return None
-        return request.user
+            logger.warning('Unauthorized access attempt from %s', request.META.get('REMOTE_ADDR'))
+            user = None
+
+        request._mapster_user = user
+        return user
@@ -1,26 +1,138 @@
+import hashlib
 import json
 import logging
+import math
 import os
+import random
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import requests
 import telebot
+from django.core.cache import cache
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast
 from django.db.transaction import atomic
 from django.utils.timezone import now
-from geopy.distance import geodesic
-from urllib3 import request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from app.settings import env
-from users.models import TelegramUser
+from users.models import RATING_MIN_GAMES, TelegramUser
 
 logger = logging.getLogger(__name__)
 
 # Constants
 MAX_PANORAMA_MOVES = 5
+# Score bonus indexed by the number of panorama moves used, up to MAX_PANORAMA_MOVES
+MOVES_BONUS = (100, 50, 20, 30, 40, 0)
 DISTANCE_ERROR_LIMIT = 2000
 RATING_UPDATING_THRESHOLD = 15
+# Leaderboard rows fetched per round trip
+RATING_CHUNK_SIZE = 2000
+# Serialized rating served to every user until the next refresh window
+RATING_CACHE_KEY = 'rating:payload'
+EARTH_RADIUS_KM = 6371.0088
+# WGS84 ellipsoid parameters used by the flat-earth approximation
+WGS84_EQUATORIAL_RADIUS_KM = 6378.137
+WGS84_FLATTENING = 1 / 298.257223563
+WGS84_E2 = WGS84_FLATTENING * (2 - WGS84_FLATTENING)
+WGS84_KM_PER_DEGREE = math.radians(WGS84_EQUATORIAL_RADIUS_KM)
+CHEAP_RULER_MAX_DELTA = 1.0
+# Matches the '@lat,lng' part of a resolved Street View URL
+COORDINATES_RE = re.compile(r'@(-?\d+\.\d+),(-?\d+\.\d+)')
+# (connect, read) timeouts in seconds for Google APIs
+REQUEST_TIMEOUT = (3, 5)
+# Reverse-geocoded countries are cached on a grid of ~11 km cells for 30 days
+COUNTRY_CACHE_PRECISION = 1
+COUNTRY_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+# Concurrent Geocoding requests when resolving countries in bulk
+GEOCODING_WORKERS = 8
+# Highest location id, used to draw random locations, is cached for a minute
+LOCATION_MAX_ID_CACHE_KEY = 'location:max_id'
+LOCATION_MAX_ID_CACHE_TIMEOUT = 60
+# Stats columns of users and locations
+USER_STATS_FIELDS = [
+    'games', 'total_errors', 'total_time', 'total_moves', 'total_score',
+    'daily_moves_remaining',
+]
+LOCATION_STATS_FIELDS = [
+    'total_guesses', 'total_errors', 'total_time', 'total_moves', 'total_score',
+]
+
+# Shared HTTP session keeps connections to Google APIs alive between calls
+session = requests.Session()
+adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=Retry(total=2, backoff_factor=0.1))
+# Street View links pasted in the admin may start with http:// before redirecting
+session.mount('http://', adapter)
+session.mount('https://', adapter)
+
+def subtract_total(counter: str, count: int, field: str, value: float | None) -> Case:
+    """
+    Subtracts a float total in SQL, resetting it to zero when the last game is removed,
+    so that rounding errors do not leave small negative totals.
+    """
+    return Case(
+        When(**{f'{counter}__lte': count}, then=Value(0.0)),
+        default=F(field) - (value or 0.0),
+        output_field=FloatField(),
+    )
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Calculates the great-circle distance in kilometers between two points using the haversine formula.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+@lru_cache(maxsize=4096)
+def cheap_ruler_factors(lat: float) -> tuple[float, float]:
+    """
+    Returns kilometers per degree of longitude and latitude at the given latitude.
+
+    The first point of a distance is always a location, so the factors are cached per location latitude.
+    """
+    cos_lat = math.cos(math.radians(lat))
+    w2 = 1 / (1 - WGS84_E2 * (1 - cos_lat * cos_lat))
+    w = math.sqrt(w2)
+    kx = WGS84_KM_PER_DEGREE * w * cos_lat
+    ky = WGS84_KM_PER_DEGREE * w * w2 * (1 - WGS84_E2)
+    return kx, ky
+
+def cheap_ruler_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Calculates the distance in kilometers between two close points using a flat-earth approximation
+    of the WGS84 ellipsoid around the first point (Mapbox cheap-ruler).
+    """
+    kx, ky = cheap_ruler_factors(lat1)
+
+    # Wrap the longitude difference across the antimeridian
+    dx = ((lng2 - lng1 + 180) % 360 - 180) * kx
+    dy = (lat2 - lat1) * ky
+    return math.sqrt(dx * dx + dy * dy)
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Calculates the distance in kilometers between two points. Uses the flat-earth approximation for
+    points within CHEAP_RULER_MAX_DELTA degrees of each other and the haversine formula otherwise.
+    """
+    if abs(lat2 - lat1) <= CHEAP_RULER_MAX_DELTA and abs((lng2 - lng1 + 180) % 360 - 180) <= CHEAP_RULER_MAX_DELTA:
+        return cheap_ruler_km(lat1, lng1, lat2, lng2)
+    return haversine_km(lat1, lng1, lat2, lng2)
+
+@lru_cache(maxsize=1)
+def get_telegram_bot(token: str) -> telebot.TeleBot:
+    """
+    Returns a TeleBot shared by all answers sent with the given token.
+    """
+    return telebot.TeleBot(token)
 
 def get_coordinates(street_view_url: str) -> tuple or None:
     """
@@ -28,9 +140,9 @@ def get_coordinates(street_view_url: str) -> tuple or None:
     """
     # Attempt to follow redirects to get the final URL
     try:
-        response = requests.head(street_view_url, allow_redirects=True)
+        response = session.head(street_view_url, allow_redirects=True, timeout=REQUEST_TIMEOUT)
         final_url = response.url
-        match = re.search(r'@(-?\d+\.\d+),(-?\d+\.\d+)', final_url)
+        match = COORDINATES_RE.search(final_url)
 
         if match:
             lat, lng = match.groups()
@@ -45,20 +157,34 @@ def get_coordinates(street_view_url: str) -> tuple or None:
 def get_country(lat: float, lng: float) -> str:
     """
     Retrieves the country name for given geographical coordinates using Google Maps Geocoding API.
+
+    Results are cached per COUNTRY_CACHE_PRECISION-degree grid cell, so nearby locations reuse one API call.
     """
+    cache_key = f'country:{lat:.{COUNTRY_CACHE_PRECISION}f}:{lng:.{COUNTRY_CACHE_PRECISION}f}'
+    country = cache.get(cache_key)
+    if country is not None:
+        return country
 
     # Construct the API URL with coordinates and API key
     url = f'https://maps.googleapis.com/maps/api/geocode/json?latlng={lat},{lng}&key={env("GOOGLE_MAP_API")}'
-    data = json.loads(request(method='GET', url=url).data)
-
-    for result in data['results']:
-        # Iterate through address components to find the country
-        for component in result['address_components']:
-            if 'country' in component['types']:
-                country = component['long_name']
-                return country
+    data = session.get(url, timeout=REQUEST_TIMEOUT).json()
+
+    # Results are ordered most specific first, so stop at the first country component
+    component = next(
+        (
+            component
+            for result in data.get('results') or []
+            for component in result['address_components']
+            if 'country' in component['types']
+        ),
+        None,
+    )
+    if component is not None:
+        country = component['long_name']
+        cache.set(cache_key, country, COUNTRY_CACHE_TIMEOUT)
+        return country
 
-    logger.warning(f'Country not found for coordinates: lat={lat}, lng={lng}')
+    logger.warning('Country not found for coordinates: lat=%s, lng=%s', lat, lng)
     raise ValueError('Country not found')
 
 
@@ -79,10 +205,10 @@ class Location(models.Model):
         total_time (PositiveIntegerField): Total time spent by users guessing this location.
         total_moves (PositiveIntegerField): Total number of panorama moves made at this location.
         total_score (PositiveIntegerField): Sum of all scores achieved at this location.
-        avg_error (FloatField): Average distance error for all guesses.
-        avg_time (PositiveIntegerField): Average time spent per guess.
-        avg_moves (PositiveIntegerField): Average number of moves per guess.
-        avg_score (FloatField): Average score achieved at this location.
+        avg_error (float): Average distance error for all guesses, computed from the totals.
+        avg_time (float): Average time spent per guess, computed from the totals.
+        avg_moves (float): Average number of moves per guess, computed from the totals.
+        avg_score (float): Average score achieved at this location, computed from the totals.
     """
 
     COMPLEXITY = (
@@ -105,54 +231,216 @@ class Location(models.Model):
     total_time = models.PositiveIntegerField(default=0)
     total_moves = models.PositiveIntegerField(default=0)
     total_score = models.FloatField(default=0)
-    avg_error = models.FloatField(default=0.0)
-    avg_time = models.PositiveIntegerField(default=0)
-    avg_moves = models.PositiveIntegerField(default=0)
-    avg_score = models.FloatField(default=0.0)
 
     class Meta:
         ordering = ['-id']
         verbose_name_plural = 'Locations'
+        indexes = [
+            # Serves the random pick of the next location within a complexity
+            models.Index(fields=['complexity', 'id'], name='location_complexity_id_idx'),
+        ]
 
     def __str__(self):
         return f'{self.id}'
 
+    @property
+    def avg_error(self) -> float:
+        return self.total_errors / self.total_guesses if self.total_guesses else 0.0
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.total_guesses if self.total_guesses else 0.0
+
+    @property
+    def avg_moves(self) -> float:
+        return self.total_moves / self.total_guesses if self.total_guesses else 0.0
+
+    @property
+    def avg_score(self) -> float:
+        return self.total_score / self.total_guesses if self.total_guesses else 0.0
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded URL, so save() only resolves coordinates when it changes
+        instance._loaded_street_view_url = instance.__dict__.get('street_view_url')
+        return instance
+
     def save(self, *args, **kwargs):
-        # If coordinates are not set, try to extract them from the URL
-        if not self.lat and not self.lng:
-            coordinates = get_coordinates(self.street_view_url)
-            if coordinates:
-                self.lat, self.lng = coordinates
-                self.country = get_country(*coordinates)
-            else:
-                self.lat, self.lng = None, None
+        from .tasks import resolve_location_coordinates
 
         is_new = self.pk is None
+        url_changed = (
+            'street_view_url' in self.__dict__
+            and self.street_view_url != getattr(self, '_loaded_street_view_url', None)
+        )
         super().save(*args, **kwargs)
+        self._loaded_street_view_url = self.__dict__.get('street_view_url')
 
         if is_new:
-            logger.info(f'New object: Location, lat={self.lat}, lng={self.lng}')
+            logger.info('New object: Location, lat=%s, lng=%s', self.lat, self.lng)
         else:
-            logger.info(f'Object was changed: Location, id={self.pk}: lat={self.lat}, lng={self.lng}.')
+            logger.info('Object was changed: Location, id=%s: lat=%s, lng=%s.', self.pk, self.lat, self.lng)
 
-    def recalculate_location_stats(self, duration: int, error: float, score: float, moves: int) -> None:
-        if not isinstance(duration, int) or not isinstance(error, float) or not isinstance(score, float) or not isinstance(moves, int):
-            raise ValueError('Data types are not as expected')
-        if duration <= 0 or error <= 0.0 or score <= 0 or moves < 0:
-            raise ValueError('Some of the values are not positive or zero')
+        # If coordinates are not set, extract them from a new URL in the background.
+        # A broker failure must not fail the saved location
+        if not self.lat and not self.lng and (is_new or url_changed):
+            transaction.on_commit(lambda: resolve_location_coordinates.delay(self.pk), robust=True)
+
+    @classmethod
+    def pick_random(cls, queryset: models.QuerySet) -> 'Location | None':
+        """
+        Returns a random location of the queryset, or None if it is empty.
+
+        A random id is drawn up to the highest location id and the first candidate at or after it
+        is taken (wrapping around to the start), so the pick is an index seek instead of sorting
+        every candidate with ORDER BY RANDOM().
+        """
+        max_id = cache.get(LOCATION_MAX_ID_CACHE_KEY)
+        if max_id is None:
+            max_id = cls.objects.aggregate(max_id=Max('id'))['max_id']
+            # An empty table is not cached, so the first locations added are picked right away
+            if max_id is None:
+                return None
+            cache.set(LOCATION_MAX_ID_CACHE_KEY, max_id, LOCATION_MAX_ID_CACHE_TIMEOUT)
+
+        pivot = random.randint(1, max_id)
+        queryset = queryset.order_by('id')
+        return queryset.filter(id__gte=pivot).first() or queryset.filter(id__lt=pivot).first()
+
+    @classmethod
+    def bulk_ingest(cls, street_view_urls: list[str], complexity: str = 'normal') -> list['Location']:
+        """
+        Creates locations from Street View URLs with a single INSERT, bypassing save().
+
+        Coordinates and countries are resolved by one Celery task per location after the
+        transaction commits, so no Google API requests are made on the calling thread.
+        """
+        from .tasks import resolve_location_coordinates
+
+        locations = cls.objects.bulk_create(
+            [cls(street_view_url=url, complexity=complexity) for url in street_view_urls]
+        )
+        location_ids = [location.pk for location in locations]
+
+        def resolve():
+            # One failed publish must not drop the remaining locations
+            for location_id in location_ids:
+                try:
+                    resolve_location_coordinates.delay(location_id)
+                except Exception as e:
+                    logger.error('Coordinates of Location id=%s were not queued: %s', location_id, e)
+
+        transaction.on_commit(resolve, robust=True)
+        logger.info('New objects: %s Locations were ingested', len(locations))
+        return locations
+
+    def resolve_coordinates(self) -> None:
+        """
+        Extracts coordinates and country from the Street View URL and stores them without calling save().
+        """
+        coordinates = get_coordinates(self.street_view_url)
+        if not coordinates:
+            logger.warning('Coordinates not found for Location id=%s', self.pk)
+            return
+
+        self.lat, self.lng = coordinates
+        try:
+            self.country = get_country(*coordinates)
+        except (ValueError, requests.exceptions.RequestException):
+            # Coordinates are kept, the country is retried by the resolve_missing_countries task
+            logger.warning('Country not resolved for Location id=%s', self.pk, exc_info=True)
+        Location.objects.filter(pk=self.pk).update(lat=self.lat, lng=self.lng, country=self.country)
+        logger.info('Coordinates were resolved: Location, id=%s: lat=%s, lng=%s.', self.pk, self.lat, self.lng)
+
+    @classmethod
+    def resolve_missing_countries(cls, batch_size: int = 100) -> int:
+        """
+        Resolves countries of up to batch_size located locations without one, running the
+        Geocoding requests concurrently, and stores them with a single bulk_update.
+        """
+        locations = list(
+            cls.objects.filter(country__isnull=True, lat__isnull=False, lng__isnull=False)
+            .only('id', 'lat', 'lng')[:batch_size]
+        )
+        if not locations:
+            return 0
+
+        def resolve(location):
+            try:
+                return get_country(location.lat, location.lng)
+            except (ValueError, requests.exceptions.RequestException):
+                logger.warning('Country not resolved for Location id=%s', location.pk)
+                return None
+
+        with ThreadPoolExecutor(max_workers=GEOCODING_WORKERS) as executor:
+            countries = list(executor.map(resolve, locations))
+
+        resolved = []
+        for location, country in zip(locations, countries, strict=True):
+            if country:
+                location.country = country
+                resolved.append(location)
+        cls.objects.bulk_update(resolved, ['country'])
+
+        logger.info('Countries were resolved for %s of %s locations', len(resolved), len(locations))
+        return len(resolved)
 
+    def recalculate_location_stats(self, duration: int, error: float, score: float, moves: int) -> None:
+        # Values are validated by the GameResult check constraint
         self.total_guesses += 1
         self.total_time += duration
         self.total_errors += error
         self.total_moves += moves
         self.total_score += score
 
-        self.avg_error = self.total_errors / self.total_guesses
-        self.avg_time = self.total_time / self.total_guesses
-        self.avg_moves = self.total_moves / self.total_guesses
-        self.avg_score = self.total_guesses / self.total_score if self.total_score > 0 else 0.0
+        logger.info('Location statistics were recalculated. Location: %s', self.id)
+
+    @classmethod
+    @atomic
+    def recompute_stats(cls, queryset: models.QuerySet | None = None, batch_size: int = 1000) -> int:
+        """
+        Rebuilds the statistics of the given locations (all by default) from their games.
 
-        logger.info(f'Location statistics were recalculated. Location: {self.id}')
+        Totals are summed by the database in one grouped query and written back with bulk_update.
+        Games whose apply_location_stats task has not run yet are included and marked as applied.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        locations = list(queryset.only('id', *LOCATION_STATS_FIELDS))
+        games = GameResult.objects.filter(location__in=queryset.values('id'))
+        games.filter(location_stats_applied=False).update(location_stats_applied=True)
+
+        totals = {
+            row['location_id']: row
+            for row in games
+            .order_by()
+            .values('location_id')
+            .annotate(
+                count=Count('id'),
+                errors=Sum('distance_error'),
+                time=Sum('duration'),
+                moves=Sum('moves_used'),
+                score=Sum('score'),
+            )
+        }
+
+        for location in locations:
+            row = totals.get(location.id)
+            if row is None:
+                for field in LOCATION_STATS_FIELDS:
+                    setattr(location, field, 0)
+                continue
+
+            location.total_guesses = row['count']
+            location.total_errors = row['errors'] or 0.0
+            location.total_time = row['time']
+            location.total_moves = row['moves']
+            location.total_score = row['score'] or 0.0
+
+        cls.objects.bulk_update(locations, LOCATION_STATS_FIELDS, batch_size=batch_size)
+        logger.info('Location statistics were recomputed for %s locations', len(locations))
+        return len(locations)
 
 
 class GameResult(models.Model):
@@ -170,6 +458,10 @@ class GameResult(models.Model):
         distance_error (FloatField): Distance in kilometers between guessed and actual location.
         duration (PositiveIntegerField): Time taken to make the guess in seconds.
         score (FloatField): Calculated score for the guess based on accuracy and time.
+        location_stats_applied (BooleanField): Whether the guess was added to the stats of its location.
+
+    save() updates the stats of the related user and location, so instances should be
+    fetched with select_related('user', 'location'). delete() reverts them in SQL.
     """
 
     id = models.AutoField(primary_key=True)
@@ -182,108 +474,111 @@ class GameResult(models.Model):
     distance_error = models.FloatField(null=True, blank=True)
     duration = models.PositiveIntegerField()
     score = models.FloatField(null=True, blank=True)
+    location_stats_applied = models.BooleanField(default=False, editable=False)
 
     class Meta:
         verbose_name_plural = 'Games'
+        indexes = [
+            models.Index(fields=['-guessed_at']),
+            models.Index(fields=['score']),
+            models.Index(fields=['user', '-guessed_at']),
+            # Serves the NOT EXISTS probe excluding guessed locations with an index-only scan
+            models.Index(fields=['user', 'location'], name='gameresult_user_location_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(duration__gt=0) & Q(distance_error__gte=0) & Q(score__gte=0) & Q(moves_used__gte=0),
+                name='gameresult_stats_non_negative',
+            ),
+        ]
 
     def calculate_score(self) -> float:
         """
         Calculate score based on error, moves, and time
         """
         error = self.distance_error
-        time = self.duration
-        score = 0
-
-        if error < DISTANCE_ERROR_LIMIT:
-            if self.moves_used < MAX_PANORAMA_MOVES:
-                if self.moves_used == 0:
-                    score += 100
-                elif self.moves_used == 1:
-                    score += 50
-                else:
-                    score += self.moves_used * 10
-            if self.duration <= 60:
-                score += ((60 - time) * 5  + (DISTANCE_ERROR_LIMIT - error)) / 10
-            else:
-                score += (DISTANCE_ERROR_LIMIT - error) / 10
-        else:
-            score = 0
+        if error >= DISTANCE_ERROR_LIMIT:
+            return 0.0
 
-        return score
+        time_bonus = max(0, 60 - self.duration) * 5
+        return MOVES_BONUS[min(self.moves_used, MAX_PANORAMA_MOVES)] + (time_bonus + (DISTANCE_ERROR_LIMIT - error)) / 10
 
     @atomic
     def save(self, *args, **kwargs):
+        from .tasks import apply_location_stats
+
         self.distance_error = self.calculate_distance_error()
         self.score = self.calculate_score()
 
-        # Recalculate stats for user and location
+        # Recalculate stats for user (validates values and keeps the instance in sync)
         self.user.recalculate_player_stats(self.duration, self.distance_error, self.score, self.moves_used)
-        self.location.recalculate_location_stats(self.duration, self.distance_error, self.score, self.moves_used)
 
-        self.user.save()
-        self.location.save()
+        # Persist user stats as in-place increments, so concurrent guesses are not lost
+        TelegramUser.objects.filter(pk=self.user_id).update(
+            games=F('games') + 1,
+            total_time=F('total_time') + self.duration,
+            total_errors=F('total_errors') + self.distance_error,
+            total_moves=F('total_moves') + self.moves_used,
+            total_score=F('total_score') + self.score,
+            daily_moves_remaining=F('daily_moves_remaining') - self.moves_used,
+            last_move_date=self.user.last_move_date,
+        )
 
         super().save(*args, **kwargs)
-        logger.info(f'New object: Guess, user={self.user.id}, location={self.location}')
+        logger.info('New object: Guess, user=%s, location=%s', self.user_id, self.location_id)
+
+        # Location stats are not part of the response, so they are persisted in the background.
+        # A broker failure must not fail the saved guess, Location.recompute_stats() catches up on it
+        transaction.on_commit(lambda: apply_location_stats.delay(self.pk), robust=True)
+
+    def apply_location_stats(self) -> None:
+        """
+        Adds the guess to the stats of its location as in-place increments.
+        """
+        Location.objects.filter(pk=self.location_id).update(
+            total_guesses=F('total_guesses') + 1,
+            total_time=F('total_time') + self.duration,
+            total_errors=F('total_errors') + self.distance_error,
+            total_moves=F('total_moves') + self.moves_used,
+            total_score=F('total_score') + self.score,
+        )
+        logger.info('Location statistics were persisted. Location: %s, Guess: %s', self.location_id, self.pk)
 
     @atomic
     def delete(self, *args, **kwargs):
-        self.user.games -= 1
-        self.location.total_guesses -= 1
-
-        # Recalculating player stats
-        if self.user.games > 1:
-            self.user.total_errors -= self.distance_error
-            self.user.total_time -= self.duration
-            self.user.avg_error = self.user.total_errors / self.user.games
-            self.user.avg_time = self.user.total_time / self.user.games
-            self.user.avg_moves_per_game = self.user.total_moves / self.user.games
-            self.user.avg_score = self.user.total_score / self.user.games
-            self.user.daily_moves_remaining += self.moves_used
-        else:
-            self.user.games = 0
-            self.user.total_errors = 0.0
-            self.user.total_time = 0
-            self.user.total_moves = 0
-            self.user.total_score = 0.0
-            self.user.avg_error = 0.0
-            self.user.avg_time = 0
-            self.user.avg_moves_per_game = 0
-            self.user.avg_score = 0.0
-            self.user.daily_moves_remaining += self.moves_used
-        self.user.save()
-
-        # Recalculating location stats
-        if self.location.total_guesses > 1:
-            self.location.total_errors -= self.distance_error
-            self.location.total_time -= self.duration
-            self.location.total_guesses -= 1
-            self.location.total_moves -= self.moves_used
-            self.location.total_score -= self.score
-            self.location.avg_error = self.location.total_errors / self.location.total_guesses
-            self.location.avg_time = self.location.total_time / self.location.total_guesses
-            self.location.avg_moves = self.location.total_moves / self.location.total_guesses
-            self.location.avg_score = self.location.total_score / self.location.total_guesses
-        else:
-            self.location.total_guesses = 0
-            self.location.total_errors = 0.0
-            self.location.total_time = 0
-            self.location.total_moves = 0
-            self.location.total_score = 0.0
-            self.location.avg_error = 0.0
-            self.location.avg_time = 0
-            self.location.avg_moves = 0
-            self.location.avg_score = 0.0
-        self.location.save()
+        # Locking the row keeps a running apply_location_stats task from adding the game while it is deleted
+        location_stats_applied = (
+            GameResult.objects.select_for_update()
+            .filter(pk=self.pk)
+            .values_list('location_stats_applied', flat=True)
+            .first()
+        )
 
-        # Delete the guess
-        super().delete(*args, **kwargs)
-        logger.info(
-            f'Object was deleted: Guess, id={self.pk}, user={self.user.id}, location={self.location}'
+        # Revert stats as in-place decrements, resetting float totals when the last game is removed
+        TelegramUser.objects.filter(pk=self.user_id).update(
+            games=F('games') - 1,
+            total_errors=subtract_total('games', 1, 'total_errors', self.distance_error),
+            total_time=F('total_time') - self.duration,
+            total_moves=F('total_moves') - self.moves_used,
+            total_score=subtract_total('games', 1, 'total_score', self.score),
+            daily_moves_remaining=F('daily_moves_remaining') + self.moves_used,
         )
+        if location_stats_applied:
+            Location.objects.filter(pk=self.location_id).update(
+                total_guesses=F('total_guesses') - 1,
+                total_errors=subtract_total('total_guesses', 1, 'total_errors', self.distance_error),
+                total_time=F('total_time') - self.duration,
+                total_moves=F('total_moves') - self.moves_used,
+                total_score=subtract_total('total_guesses', 1, 'total_score', self.score),
+            )
+
+        # Delete the guess
+        result = super().delete(*args, **kwargs)
+        logger.info('Object was deleted: Guess, user=%s, location=%s', self.user_id, self.location_id)
+        return result
 
     def calculate_distance_error(self) -> float:
-        return geodesic((self.guessed_lat, self.guessed_lng), (self.location.lat, self.location.lng)).kilometers
+        return distance_km(self.location.lat, self.location.lng, self.guessed_lat, self.guessed_lng)
 
 
 class Rating(models.Model):
@@ -294,6 +589,7 @@ class Rating(models.Model):
         id (AutoField): Primary key for the rating entry.
         data (JSONField): JSON array containing user ranking data including username,
                          games played, total score, and average score per game.
+        data_hash (CharField): Digest of the serialized data, used to detect changes.
         updated_at (DateTimeField): Timestamp of the last rating update.
 
     Methods:
@@ -303,6 +599,7 @@ class Rating(models.Model):
 
     id = models.AutoField(primary_key=True)
     data = models.JSONField(default=list)
+    data_hash = models.CharField(max_length=16, blank=True, default='')
     updated_at = models.DateTimeField(auto_now=True, null=True)
 
     def __str__(self):
@@ -311,35 +608,46 @@ class Rating(models.Model):
     def update_rating(self) -> None:
         """
         Updates the rating data if more than 15 seconds have passed since the last update.
+
+        The refresh is guarded by a cache lock, so concurrent requests do not all query the users.
         """
         current_time = now()
         # Avoid frequent updates
         if self.updated_at is not None and (current_time - self.updated_at).total_seconds() <= RATING_UPDATING_THRESHOLD:
             return
 
-        # Update data only if it has changed
+        # Only one of the concurrent requests seeing the same stale rating recomputes it
+        lock_key = f'rating:refresh:{self.pk}:{self.updated_at.timestamp() if self.updated_at else 0}'
+        if not cache.add(lock_key, True, RATING_UPDATING_THRESHOLD):
+            return
+
+        # Update data only if it has changed, comparing digests instead of the lists
         new_data = self.create_rating_data()
-        if self.data != new_data:
+        new_hash = self.hash_rating_data(new_data)
+        if self.data_hash != new_hash:
             with transaction.atomic():
                 self.data = new_data
+                self.data_hash = new_hash
                 self.updated_at = current_time
-                self.save()
+                self.save(update_fields=['data', 'data_hash', 'updated_at'])
 
         logger.info('Rating data was updated')
 
     @staticmethod
     def create_rating_data() -> list:
-        users = TelegramUser.objects.filter(games__gte=5).order_by('-total_score')
-        rating_data = [
-            {
-                "username": user.username,
-                "games": user.games,
-                "score": user.total_score,
-                "score_for_game": user.total_score / user.games if user.games > 0 else 0,
-            }
-            for user in users
-        ]
-        return rating_data
+        # Rows are built by the database and streamed in chunks, skipping model instantiation per user
+        users = TelegramUser.objects.filter(games__gte=RATING_MIN_GAMES).order_by('-total_score').values(
+            'username',
+            'games',
+            score=F('total_score'),
+            score_for_game=Cast('total_score', models.FloatField()) / F('games'),
+        )
+        return list(users.iterator(chunk_size=RATING_CHUNK_SIZE))
+
+    @staticmethod
+    def hash_rating_data(data: list) -> str:
+        serialized = json.dumps(data, separators=(',', ':')).encode()
+        return hashlib.blake2b(serialized, digest_size=8).hexdigest()
 
 
 class Feedback(models.Model):
@@ -355,6 +663,7 @@ class Feedback(models.Model):
         Answered (BooleanField): Indicates whether the feedback has been answered.
         Feedback_text (TextField): The actual feedback content submitted by the user.
         Answer (TextField): The administrative response to the feedback.
+        Send_claimed_at (DateTimeField): Timestamp when a send_feedback_answer run claimed the answer for sending.
     """
 
     id = models.AutoField(primary_key=True)
@@ -363,6 +672,7 @@ class Feedback(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     answered_at = models.DateTimeField(null=True, blank=True)
     sent_at = models.DateTimeField(null=True, blank=True)
+    send_claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
     answered = models.BooleanField(default=False)
 
     feedback_text = models.TextField()
@@ -370,6 +680,14 @@ class Feedback(models.Model):
 
     class Meta:
         ordering = ['-answered', '-created_at']
+        indexes = [
+            # Keeps the lookup of answers waiting to be sent small, as most answers are already sent
+            models.Index(
+                fields=['id'],
+                name='feedback_pending_answer_idx',
+                condition=Q(answered=True, sent_at__isnull=True),
+            ),
+        ]
 
     def __str__(self):
         return f'Feedback id {self.id}, user {self.user}, message "{self.feedback_text}"'
@@ -382,25 +700,32 @@ class Feedback(models.Model):
         super().save(*args, **kwargs)
 
     # Method to send the answer to the user via Telegram
-    def send_answer(self) -> None:
+    def send_answer(self, commit: bool = True) -> bool:
+        """
+        Sends the answer and sets sent_at. With commit=False sent_at is not saved, so that
+        callers sending a batch can write it with a single bulk_update.
+        """
         if not self.answered or not self.answer or not self.user or not hasattr(self.user, 'chat_id'):
-            logger.warning(
-                f"Cannot send answer for Feedback id {self.id}: missing data")
-            return
+            logger.warning('Cannot send answer for Feedback id %s: missing data', self.id)
+            return False
 
         user_chat_id = self.user.chat_id
         try:
             token = os.environ.get("TELEGRAM_TOKEN")
             if not token:
                 logger.error("TELEGRAM_TOKEN environment variable not set.")
-                return
-            # Initialize Telegram bot and send message
-            bot = telebot.TeleBot(token)
+                return False
+            # Reuse the shared Telegram bot and send message
+            bot = get_telegram_bot(token)
             message_text = f'Answer for your feedback:\n\n{self.answer}\n\nThank you for your opinion!'
             bot.send_message(chat_id=user_chat_id, text=message_text)
-            logger.info(f'Answer for Feedback id {self.id} for user {self.user} was sent successfully.')
+            logger.info('Answer for Feedback id %s for user %s was sent successfully.', self.id, self.user)
             self.sent_at = now()
-            self.save(update_fields=['sent_at'])
+            if commit:
+                # Write only sent_at, bypassing Feedback.save()
+                Feedback.objects.filter(pk=self.pk).update(sent_at=self.sent_at)
+            return True
 
         except Exception as e:
-            logger.error(f"Error sending answer for Feedback id {self.id}: {e}")
+            logger.error('Error sending answer for Feedback id %s: %s', self.id, e)
+            return False
@@ -27,8 +27,12 @@ class LocationSerializer(serializers.ModelSerializer):
 
 
 class GameResultSerializer(serializers.ModelSerializer):
-    location_id = serializers.PrimaryKeyRelatedField(queryset=Location.objects.all(), source='location')
-    user_id = serializers.PrimaryKeyRelatedField(queryset=TelegramUser.objects.all(), source='user')
+    # Load only the columns used by GameResult.save()
+    location_id = serializers.PrimaryKeyRelatedField(
+        queryset=Location.objects.only('id', 'lat', 'lng'), source='location'
+    )
+    # The user is passed to save() by the view
+    user_id = serializers.PrimaryKeyRelatedField(source='user', read_only=True)
 
     class Meta:
         model = GameResult
@@ -46,7 +50,9 @@ class RatingSerializer(serializers.ModelSerializer):
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
-    user_id = serializers.PrimaryKeyRelatedField(queryset=TelegramUser.objects.all(), source='user')
+    # The user is passed to save() by the view
+    user_id = serializers.PrimaryKeyRelatedField(source='user', read_only=True)
+
     class Meta:
         model = Feedback
         fields = [
@@ -1,33 +1,123 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 
 from celery import shared_task
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
 
-from .models import Feedback
+from .models import Feedback, GameResult, Location
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Telegram requests when sending feedback answers
+TELEGRAM_WORKERS = 8
+# Claimed answers that were not sent within this time (e.g. the worker died) are claimed again
+FEEDBACK_SEND_CLAIM_TIMEOUT = timedelta(minutes=10)
+
 @shared_task()
 def send_feedback_answer() -> None:
     """
-    Send feedback answers to the respective recipients if they are marked as answered.
+    Send feedback answers that were answered but not sent yet.
 
-    This function retrieves all feedback instances that are flagged as answered and
-    processes them by sending out the respective feedback answers. It performs logging
-    at each step to indicate the progress and status of the operation. The function
-    ensures no feedback is left unsent if it meets the criteria.
+    Pending answers are claimed in a short transaction with SKIP LOCKED, so overlapping
+    runs never send the same answer twice and no row lock is held while Telegram is
+    called. Answers are sent concurrently through the shared Telegram bot, then their
+    sent_at timestamps are written with a single bulk update and failed answers are
+    released for the next run.
 
     :return: None
     """
     logger.info('Start sending feedback answers')
-    answers = Feedback.objects.filter(answered=True).all()
-    if not answers:
-        logger.info('No feedback answers to send')
+    claimed_at = now()
+    with transaction.atomic():
+        answers = list(
+            Feedback.objects.select_for_update(skip_locked=True, of=('self',))
+            .select_related('user')
+            .filter(answered=True, sent_at__isnull=True)
+            .filter(Q(send_claimed_at__isnull=True) | Q(send_claimed_at__lt=claimed_at - FEEDBACK_SEND_CLAIM_TIMEOUT))
+            # Skip feedback_text and unused user columns, only the answer is sent
+            .only('id', 'answered', 'answer', 'sent_at', 'user__chat_id', 'user__username', 'user__telegram_id')
+        )
+        if not answers:
+            logger.info('No feedback answers to send')
+            return None
+        Feedback.objects.filter(pk__in=[answer.pk for answer in answers]).update(send_claimed_at=claimed_at)
+
+    logger.info('Found %s feedback answers to send', len(answers))
+    # Answers only hit the Telegram API here, so they are sent concurrently
+    with ThreadPoolExecutor(max_workers=TELEGRAM_WORKERS) as executor:
+        results = list(executor.map(lambda answer: answer.send_answer(commit=False), answers))
+    sent = [answer for answer, is_sent in zip(answers, results, strict=True) if is_sent]
+    failed_ids = [answer.pk for answer, is_sent in zip(answers, results, strict=True) if not is_sent]
+
+    with transaction.atomic():
+        Feedback.objects.bulk_update(sent, ['sent_at'])
+        Feedback.objects.filter(pk__in=failed_ids).update(send_claimed_at=None)
+
+    logger.info('%s of %s feedback answers were sent', len(sent), len(answers))
+    return None
+
+
+@shared_task()
+def resolve_location_coordinates(location_id: int) -> None:
+    """
+    Resolve the coordinates and country of a location from its Street View URL.
+
+    Location.save() schedules this task instead of calling the Street View and
+    Geocoding APIs on the request thread. The result is written with a queryset
+    update, so Location.save() is not re-entered.
+
+    :param location_id: Primary key of the location to resolve.
+    :return: None
+    """
+    location = Location.objects.filter(pk=location_id).first()
+    if location is None:
+        logger.warning('Location id %s not found, coordinates were not resolved', location_id)
         return None
 
-    logger.info(f'Found {len(answers)} feedback answers to send')
-    for answer in answers:
-        answer.send_answer()
-        logger.info(f'Feedback answer was sent: id {answer.id}')
+    location.resolve_coordinates()
+    return None
+
+
+@shared_task()
+def resolve_missing_countries(batch_size: int = 100) -> int:
+    """
+    Resolve countries of locations that have coordinates but no country yet.
+
+    Picks up locations whose Geocoding request failed when their coordinates were
+    resolved, as well as locations imported with coordinates only.
+
+    :param batch_size: Maximum number of locations resolved per run.
+    :return: Number of locations whose country was resolved.
+    """
+    return Location.resolve_missing_countries(batch_size)
+
+
+@shared_task()
+def apply_location_stats(game_result_id: int) -> None:
+    """
+    Add a submitted guess to the stats of its location.
+
+    GameResult.save() schedules this task after commit, so the guess response
+    only waits for the user stats update.
+
+    :param game_result_id: Primary key of the submitted game result.
+    :return: None
+    """
+    with transaction.atomic():
+        # Claiming the flag makes duplicate runs no-ops and tells GameResult.delete() what to revert
+        claimed = GameResult.objects.filter(pk=game_result_id, location_stats_applied=False).update(
+            location_stats_applied=True
+        )
+        if not claimed:
+            logger.warning('Game result id %s not found or already applied, location stats were not updated', game_result_id)
+            return None
 
-    logger.info('All feedback answers were sent')
+        game_result = (
+            GameResult.objects.only('id', 'location_id', 'duration', 'distance_error', 'moves_used', 'score')
+            .get(pk=game_result_id)
+        )
+        game_result.apply_location_stats()
     return None
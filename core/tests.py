@@ -1,23 +1,63 @@
+import json
 from datetime import timedelta
 from unittest.mock import Mock, patch
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from core.models import (
+    RATING_CACHE_KEY,
     Feedback,
     GameResult,
     Location,
     Rating,
+    cheap_ruler_km,
     get_coordinates,
     get_country,
+    get_telegram_bot,
+    haversine_km,
 )
-from users.models import TelegramUser
+from core.tasks import (
+    apply_location_stats,
+    resolve_location_coordinates,
+    send_feedback_answer,
+)
+from users.models import DAILY_MOVES_LIMIT, TelegramUser
 
 
 class GeneralTestMixin:
+    @classmethod
+    def setUpClass(cls):
+        # mocks are patched once per class, setUp only resets their state
+        cls.patcher_coordinates = patch('core.models.get_coordinates')
+        cls.patcher_country = patch('core.models.get_country')
+        # resolving coordinates and stats synchronously instead of through the Celery broker
+        cls.patcher_resolve = patch(
+            'core.tasks.resolve_location_coordinates.delay',
+            side_effect=resolve_location_coordinates
+        )
+        cls.patcher_location_stats = patch(
+            'core.tasks.apply_location_stats.delay',
+            side_effect=apply_location_stats
+        )
+
+        cls.mock_get_coordinates = cls.patcher_coordinates.start()
+        cls.mock_get_country = cls.patcher_country.start()
+        cls.mock_resolve = cls.patcher_resolve.start()
+        cls.mock_location_stats = cls.patcher_location_stats.start()
+        for patcher in (cls.patcher_coordinates, cls.patcher_country, cls.patcher_resolve, cls.patcher_location_stats):
+            cls.addClassCleanup(patcher.stop)
+
+        super().setUpClass()
+
     @classmethod
     def setUpTestData(cls):
         cls.street_url = 'https://maps.app.goo.gl/7Q9BX6YNMA7juebS6'
@@ -28,88 +68,199 @@ class GeneralTestMixin:
         cls.error = 0.1
         cls.score = 329.49
         cls.moves = 1
+        cls.reset_mocks()
 
-    def setUp(self):
-        # mocks
-        self.patcher_coordinates = patch('core.models.get_coordinates')
-        self.patcher_country = patch('core.models.get_country')
-
-        self.mock_get_coordinates = self.patcher_coordinates.start()
-        self.mock_get_country = self.patcher_country.start()
-
-        self.mock_get_coordinates.return_value = (self.lat, self.lng)
-        self.mock_get_country.return_value = self.country
-
-        # creating objects
-        self.user = TelegramUser.objects.create(
+        # creating objects once per class
+        cls.user = TelegramUser.objects.create(
             telegram_id = '123456789',
             chat_id = 123456789
         )
-        self.location = Location.objects.create(
-            street_view_url = self.street_url,
-            complexity='easy'
-        )
+        cls.location = cls.create_location(complexity='easy')
+
+    @classmethod
+    def reset_mocks(cls):
+        cls.mock_get_coordinates.reset_mock(return_value=True, side_effect=True)
+        cls.mock_get_country.reset_mock(return_value=True, side_effect=True)
+        cls.mock_resolve.reset_mock()
+        cls.mock_location_stats.reset_mock()
 
-    def tearDown(self):
-        self.patcher_coordinates.stop()
-        self.patcher_country.stop()
+        cls.mock_get_coordinates.return_value = (cls.lat, cls.lng)
+        cls.mock_get_country.return_value = cls.country
+
+    def setUp(self):
+        self.reset_mocks()
+        # cached countries, rating payloads and throttle history must not leak between tests
+        cache.clear()
+
+    @classmethod
+    def create_location(cls, complexity):
+        with cls.captureOnCommitCallbacks(execute=True):
+            location = Location.objects.create(
+                street_view_url = cls.street_url,
+                complexity=complexity
+            )
+        location.refresh_from_db()
+        return location
+
+    @classmethod
+    def bulk_make_users(cls, n):
+        """
+        Creates n rated users with a single INSERT.
+        """
+        return TelegramUser.objects.bulk_create([
+            TelegramUser(telegram_id=str(1000 + i), username=str(1000 + i), chat_id=1000 + i, games=10, total_score=100.0)
+            for i in range(n)
+        ])
 
     @patch('core.models.GameResult.calculate_distance_error')
     def create_game_result(self, mock_calculate_distance_error):
         mock_calculate_distance_error.return_value = 0.1
-        game_result = GameResult.objects.create(
-            user=self.user,
-            location=self.location,
-            guessed_lat=50.0,
-            guessed_lng=-115.0,
-            duration=1,
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            game_result = GameResult.objects.create(
+                user=self.user,
+                location=self.location,
+                guessed_lat=50.0,
+                guessed_lng=-115.0,
+                duration=1,
+            )
         return game_result
 
 # Models tests
 
 class LocationModelTest(GeneralTestMixin, TestCase):
+    # the module-level functions are imported before patching, so these call the real APIs
     def test_get_coordinates_good_data(self):
-        self.patcher_coordinates.stop()
-        self.patcher_country.stop()
-
         coordinates = get_coordinates(self.street_url)
         self.assertEqual((self.lat, self.lng), coordinates)
 
-        self.patcher_coordinates.start()
-        self.patcher_country.start()
-
     def test_get_coordinates_invalid_data(self):
-        self.patcher_coordinates.stop()
-
         coordinates = get_coordinates('wrong_url')
         self.assertIsNone(coordinates)
 
-        self.patcher_coordinates.start()
-
     def test_get_country_good_data(self):
-        self.patcher_country.stop()
-
         country = get_country(self.lat, self.lng)
         self.assertEqual(country, self.country)
 
-        self.patcher_country.start()
-
     def test_get_country_invalid_data(self):
-        self.patcher_country.stop()
-
         with self.assertRaisesMessage(ValueError, 'Country not found'):
             get_country(0, 0)
 
-        self.patcher_country.start()
+    def test_loading_locations_dump(self):
+        # the fixture is loaded on every docker-compose start, so it has to match the current schema
+        fixture = settings.BASE_DIR / 'locations_dump.json'
+        call_command('loaddata', fixture, verbosity=0)
+
+        pks = [row['pk'] for row in json.loads(fixture.read_text())]
+        self.assertEqual(Location.objects.filter(pk__in=pks).count(), 43)
+
+    @patch('core.models.session.get')
+    def test_get_country_cached_by_grid_cell(self, mock_get):
+        mock_get.return_value.json.return_value = {
+            'results': [{'address_components': [{'long_name': self.country, 'types': ['country', 'political']}]}]
+        }
+
+        self.assertEqual(get_country(12.3401, 45.6701), self.country)
+        self.assertEqual(get_country(12.3449, 45.6749), self.country)
+        mock_get.assert_called_once()
 
     def test_location_creation(self):
+        location = self.create_location(complexity='easy')
+
         self.mock_get_coordinates.assert_called_once_with(self.street_url)
         self.mock_get_country.assert_called_once_with(self.lat, self.lng)
 
-        self.assertEqual(self.location.street_view_url, self.street_url)
-        self.assertEqual(self.location.lat, self.lat)
-        self.assertEqual(self.location.lng, self.lng)
+        self.assertEqual(location.street_view_url, self.street_url)
+        self.assertEqual(location.lat, self.lat)
+        self.assertEqual(location.lng, self.lng)
+        self.assertEqual(location.country, self.country)
+
+    def test_location_creation_resolves_coordinates_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            location = Location.objects.create(street_view_url=self.street_url)
+
+        self.assertIsNone(location.lat)
+        self.assertIsNone(location.lng)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.mock_resolve.assert_called_with(location.id)
+        location.refresh_from_db()
+        self.assertEqual((location.lat, location.lng), (self.lat, self.lng))
+        self.assertEqual(location.country, self.country)
+
+    def test_location_creation_keeps_coordinates_without_country(self):
+        self.mock_get_country.side_effect = ValueError('Country not found')
+        location = self.create_location(complexity='hard')
+
+        self.assertEqual((location.lat, location.lng), (self.lat, self.lng))
+        self.assertIsNone(location.country)
+
+    def test_location_resolves_coordinates_only_for_new_url(self):
+        with self.captureOnCommitCallbacks():
+            location = Location.objects.create(street_view_url=self.street_url)
+        location = Location.objects.get(pk=location.pk)
+
+        location.complexity = 'hard'
+        with self.captureOnCommitCallbacks() as callbacks:
+            location.save()
+        self.assertEqual(len(callbacks), 0)
+
+        location.street_view_url = 'https://maps.app.goo.gl/new'
+        with self.captureOnCommitCallbacks() as callbacks:
+            location.save()
+        self.assertEqual(len(callbacks), 1)
+
+    def test_location_creation_survives_broker_failure(self):
+        with patch('core.tasks.resolve_location_coordinates.delay', side_effect=ConnectionError('broker is down')):
+            location = self.create_location(complexity='hard')
+
+        self.assertIsNone(location.lat)
+        self.assertTrue(Location.objects.filter(pk=location.pk).exists())
+
+    def test_bulk_ingest_resolves_coordinates_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            locations = Location.bulk_ingest([self.street_url, self.street_url], complexity='hard')
+
+        self.assertEqual(self.mock_resolve.call_count, 2)
+        for location in locations:
+            location.refresh_from_db()
+            self.assertEqual(location.complexity, 'hard')
+            self.assertEqual((location.lat, location.lng), (self.lat, self.lng))
+            self.assertEqual(location.country, self.country)
+
+    def test_bulk_ingest_survives_broker_failure(self):
+        delay_side_effect = [ConnectionError('broker is down'), None]
+        with patch('core.tasks.resolve_location_coordinates.delay', side_effect=delay_side_effect) as mock_resolve:
+            with self.captureOnCommitCallbacks(execute=True):
+                locations = Location.bulk_ingest([self.street_url, self.street_url])
+
+        # the second location is still queued after the first publish failed
+        self.assertEqual(mock_resolve.call_count, 2)
+        mock_resolve.assert_called_with(locations[1].id)
+
+    def test_pick_random_wraps_around(self):
+        newer_location = self.create_location(complexity='hard')
+        queryset = Location.objects.filter(complexity='easy')
+
+        with patch('core.models.random.randint', return_value=newer_location.id):
+            self.assertEqual(Location.pick_random(queryset), self.location)
+        self.assertIsNone(Location.pick_random(queryset.none()))
+
+    def test_pick_random_does_not_cache_empty_table(self):
+        Location.objects.all().delete()
+        self.assertIsNone(Location.pick_random(Location.objects.all()))
+
+        location = self.create_location(complexity='normal')
+        self.assertEqual(Location.pick_random(Location.objects.all()), location)
+
+    def test_resolve_missing_countries(self):
+        Location.objects.filter(pk=self.location.pk).update(country=None)
+        self.mock_get_country.reset_mock()
+
+        self.assertEqual(Location.resolve_missing_countries(), 1)
+
+        self.mock_get_country.assert_called_once_with(self.lat, self.lng)
+        self.location.refresh_from_db()
         self.assertEqual(self.location.country, self.country)
 
     def test_location_recalculate_stats(self):
@@ -129,12 +280,21 @@ class LocationModelTest(GeneralTestMixin, TestCase):
         self.assertEqual(self.location.total_moves, 1)
         self.assertEqual(self.location.total_score, 1.0)
 
-    def test_location_recalculate_stats_with_invalid_data(self):
-        with self.assertRaisesMessage(ValueError, 'Data types are not as expected'):
-            self.location.recalculate_location_stats(1,1,'a',1)
+    def test_location_recompute_stats(self):
+        self.create_game_result()
+        self.create_game_result()
+        Location.objects.filter(pk=self.location.pk).update(total_guesses=0, total_time=0, total_errors=0.0)
+        empty_location = self.create_location(complexity='hard')
+
+        self.assertEqual(Location.recompute_stats(), 2)
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 2)
+        self.assertEqual(self.location.total_time, 2)
+        self.assertAlmostEqual(self.location.avg_error, 0.1)
 
-        with self.assertRaisesMessage(ValueError, 'Some of the values are not positive or zero'):
-            self.location.recalculate_location_stats(0,0.0,0.0,0)
+        empty_location.refresh_from_db()
+        self.assertEqual(empty_location.total_guesses, 0)
 
 
 class GameResultModelTest(GeneralTestMixin, TestCase):
@@ -152,28 +312,219 @@ class GameResultModelTest(GeneralTestMixin, TestCase):
         self.assertEqual(self.user.total_errors, 0.1)
         self.assertEqual(self.user.total_score, 329.49)
 
-        # recalculation for location
+        # recalculation for location, persisted by apply_location_stats after commit
+        self.location.refresh_from_db()
         self.assertEqual(self.location.total_score, 329.49)
         self.assertEqual(self.location.total_guesses, 1)
         self.assertEqual(self.location.total_time, 1)
         self.assertEqual(self.location.total_errors, 0.1)
 
+    def test_game_result_creation_persists_stats(self):
+        self.create_game_result()
+        self.create_game_result()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.games, 2)
+        self.assertEqual(self.user.total_time, 2)
+        self.assertEqual(self.user.avg_time, 1)
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 2)
+        self.assertEqual(self.location.total_time, 2)
+        self.assertAlmostEqual(self.location.avg_error, 0.1)
+
+    def test_game_result_creation_defers_location_stats(self):
+        with self.captureOnCommitCallbacks() as callbacks, \
+                patch('core.models.GameResult.calculate_distance_error', return_value=0.1):
+            game_result = GameResult.objects.create(
+                user=self.user,
+                location=self.location,
+                guessed_lat=50.0,
+                guessed_lng=-115.0,
+                duration=1,
+            )
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 0)
+        self.assertEqual(len(callbacks), 1)
+
+        callbacks[0]()
+        self.mock_location_stats.assert_called_once_with(game_result.id)
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 1)
+        self.assertAlmostEqual(self.location.total_score, game_result.score)
+
+    def test_location_stats_are_applied_once(self):
+        game_result = self.create_game_result()
+        apply_location_stats(game_result.id)
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 1)
+        game_result.refresh_from_db()
+        self.assertTrue(game_result.location_stats_applied)
+
+    def test_game_result_deletion_before_location_stats(self):
+        with self.captureOnCommitCallbacks() as callbacks, \
+                patch('core.models.GameResult.calculate_distance_error', return_value=0.1):
+            game_result = GameResult.objects.create(
+                user=self.user,
+                location=self.location,
+                guessed_lat=50.0,
+                guessed_lng=-115.0,
+                duration=1,
+            )
+        game_result.delete()
+
+        # the stats were never added, so neither deletion nor the late task changes them
+        callbacks[0]()
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 0)
+        self.assertEqual(self.location.total_time, 0)
+
+    def test_game_result_creation_survives_broker_failure(self):
+        with patch('core.tasks.apply_location_stats.delay', side_effect=ConnectionError('broker is down')):
+            game_result = self.create_game_result()
+
+        game_result.refresh_from_db()
+        self.assertFalse(game_result.location_stats_applied)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.games, 1)
+
+        # recomputing picks up the game the task never added
+        Location.recompute_stats()
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 1)
+        game_result.refresh_from_db()
+        self.assertTrue(game_result.location_stats_applied)
+
     def test_game_result_deletion(self):
         game_result = self.create_game_result()
         game_result.delete()
 
         # recalculation for user
+        self.user.refresh_from_db()
         self.assertEqual(self.user.games, 0)
         self.assertEqual(self.user.total_time, 0)
         self.assertEqual(self.user.total_errors, 0.0)
         self.assertEqual(self.user.total_score, 0.0)
 
         # recalculation for location
+        self.location.refresh_from_db()
         self.assertEqual(self.location.total_score, 0.0)
         self.assertEqual(self.location.total_guesses, 0)
         self.assertEqual(self.location.total_time, 0)
         self.assertEqual(self.location.total_errors, 0.0)
 
+    def test_game_result_deletion_keeps_other_games(self):
+        self.create_game_result()
+        game_result = self.create_game_result()
+        game_result.delete()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.games, 1)
+        self.assertEqual(self.user.total_time, 1)
+        self.assertAlmostEqual(self.user.total_score, game_result.score)
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 1)
+        self.assertAlmostEqual(self.location.total_errors, 0.1)
+
+    def test_game_result_with_invalid_duration(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            GameResult.objects.create(
+                user=self.user,
+                location=self.location,
+                guessed_lat=self.lat,
+                guessed_lng=self.lng,
+                duration=0,
+            )
+
+        self.assertEqual(GameResult.objects.count(), 0)
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 0)
+
+    def test_calculate_distance_error(self):
+        game_result = GameResult(
+            user=self.user,
+            location=self.location,
+            guessed_lat=self.lat,
+            guessed_lng=self.lng + 1.0,
+            duration=1,
+        )
+        self.assertAlmostEqual(game_result.calculate_distance_error(), 70.063, places=3)
+
+        game_result.guessed_lng = self.lng + 10.0
+        self.assertAlmostEqual(game_result.calculate_distance_error(), haversine_km(self.lat, self.lng + 10.0, self.lat, self.lng))
+        self.assertAlmostEqual(haversine_km(0.0, 0.0, 0.0, 1.0), 111.195, places=3)
+
+    def test_calculate_score(self):
+        game_result = GameResult(distance_error=100.0, duration=50, moves_used=2)
+        self.assertEqual(game_result.calculate_score(), 20 + (10 * 5 + 1900) / 10)
+
+        game_result.duration = 90
+        game_result.moves_used = 5
+        self.assertEqual(game_result.calculate_score(), 1900 / 10)
+
+        game_result.distance_error = 2000.0
+        self.assertEqual(game_result.calculate_score(), 0)
+
+    def test_cheap_ruler_wraps_antimeridian(self):
+        self.assertAlmostEqual(cheap_ruler_km(0.0, 179.5, 0.0, -179.5), cheap_ruler_km(0.0, -0.5, 0.0, 0.5))
+
+
+class GuessAdminTest(GeneralTestMixin, TestCase):
+    def test_get_object_loads_user_and_location(self):
+        game_result = self.create_game_result()
+        model_admin = admin.site._registry[GameResult]
+
+        with self.assertNumQueries(1):
+            obj = model_admin.get_object(RequestFactory().get('/'), str(game_result.pk))
+            self.assertEqual(obj.user.games, 1)
+            self.assertEqual(obj.location.total_guesses, 1)
+
+    def test_delete_queryset_reverts_stats(self):
+        self.create_game_result()
+        self.create_game_result()
+
+        model_admin = admin.site._registry[GameResult]
+        model_admin.delete_queryset(None, GameResult.objects.all())
+
+        self.assertEqual(GameResult.objects.count(), 0)
+
+        # recalculation for user
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.games, 0)
+        self.assertEqual(self.user.total_time, 0)
+        self.assertEqual(self.user.total_moves, 0)
+        self.assertAlmostEqual(self.user.total_score, 0.0)
+        self.assertEqual(self.user.avg_time, 0)
+
+        # recalculation for location
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 0)
+        self.assertEqual(self.location.total_time, 0)
+        self.assertAlmostEqual(self.location.total_score, 0.0)
+        self.assertEqual(self.location.avg_score, 0.0)
+
+    def test_delete_queryset_skips_pending_location_stats(self):
+        self.create_game_result()
+        with self.captureOnCommitCallbacks(), \
+                patch('core.models.GameResult.calculate_distance_error', return_value=0.1):
+            GameResult.objects.create(
+                user=self.user,
+                location=self.location,
+                guessed_lat=50.0,
+                guessed_lng=-115.0,
+                duration=1,
+            )
+
+        model_admin = admin.site._registry[GameResult]
+        model_admin.delete_queryset(None, GameResult.objects.all())
+
+        self.location.refresh_from_db()
+        self.assertEqual(self.location.total_guesses, 0)
+        self.assertEqual(self.location.total_time, 0)
+
 
 class RatingModelTest(GeneralTestMixin, TestCase):
     def create_rating_object(self):
@@ -199,8 +550,36 @@ class RatingModelTest(GeneralTestMixin, TestCase):
             self.assertEqual(rating.data[0]['score'], self.user.total_score)
             self.assertEqual(rating.data[0]['score_for_game'], self.user.total_score / self.user.games)
 
+    def test_rating_data_built_with_one_query(self):
+        self.bulk_make_users(50)
+
+        with self.assertNumQueries(1):
+            data = Rating.create_rating_data()
+
+        self.assertEqual(len(data), 50)
+        self.assertEqual(data[0]['score_for_game'], 10.0)
+
+    def test_concurrent_rating_updates_recompute_once(self):
+        rating = self.create_rating_object()
+        concurrent_rating = Rating.objects.get(pk=rating.pk)
+
+        with patch('core.models.now') as mock_now, \
+                patch.object(Rating, 'create_rating_data', return_value=[]) as mock_create:
+            mock_now.return_value = rating.updated_at + timedelta(seconds=30)
+
+            rating.update_rating()
+            concurrent_rating.update_rating()
+
+            mock_create.assert_called_once()
+
 
 class FeedbackModelTest(GeneralTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # the bot is cached per token, so every test gets its own mocked instance
+        get_telegram_bot.cache_clear()
+        self.addCleanup(get_telegram_bot.cache_clear)
+
     def create_feedback(self, answered=False, with_answer=True):
         feedback = Feedback.objects.create(
             user=self.user,
@@ -210,7 +589,8 @@ class FeedbackModelTest(GeneralTestMixin, TestCase):
 
         if with_answer:
             feedback.answer = 'Test answer'
-            feedback.save()
+            # Feedback.save() marks the answer as answered
+            feedback.save(update_fields=['answer', 'answered', 'answered_at'])
 
         return feedback
 
@@ -265,6 +645,61 @@ class FeedbackModelTest(GeneralTestMixin, TestCase):
         feedback.refresh_from_db()
         self.assertIsNone(feedback.sent_at)
 
+    @patch('telebot.TeleBot')
+    @patch('os.environ.get')
+    def test_send_feedback_answer_task_sends_pending_only(self, mock_env_get, mock_telebot):
+        mock_env_get.return_value = 'test_token'
+        mock_bot_instance = Mock()
+        mock_telebot.return_value = mock_bot_instance
+
+        pending = self.create_feedback(answered=True, with_answer=True)
+        already_sent = self.create_feedback(answered=True, with_answer=True)
+        Feedback.objects.filter(pk=already_sent.pk).update(sent_at=already_sent.created_at)
+
+        send_feedback_answer()
+
+        mock_bot_instance.send_message.assert_called_once()
+        pending.refresh_from_db()
+        self.assertIsNotNone(pending.sent_at)
+
+    @patch('telebot.TeleBot')
+    @patch('os.environ.get')
+    def test_send_feedback_answer_task_skips_claimed(self, mock_env_get, mock_telebot):
+        mock_env_get.return_value = 'test_token'
+        mock_bot_instance = Mock()
+        mock_telebot.return_value = mock_bot_instance
+
+        claimed = self.create_feedback(answered=True, with_answer=True)
+        stale = self.create_feedback(answered=True, with_answer=True)
+        Feedback.objects.filter(pk=claimed.pk).update(send_claimed_at=timezone.now())
+        Feedback.objects.filter(pk=stale.pk).update(send_claimed_at=timezone.now() - timedelta(hours=1))
+
+        send_feedback_answer()
+
+        # an answer claimed by a running task is left to it, a stale claim is taken over
+        mock_bot_instance.send_message.assert_called_once()
+        claimed.refresh_from_db()
+        stale.refresh_from_db()
+        self.assertIsNone(claimed.sent_at)
+        self.assertIsNotNone(stale.sent_at)
+
+    @patch('telebot.TeleBot')
+    @patch('os.environ.get')
+    def test_send_feedback_answer_task_releases_failed(self, mock_env_get, mock_telebot):
+        mock_env_get.return_value = 'test_token'
+        mock_bot_instance = Mock()
+        mock_bot_instance.send_message.side_effect = Exception('Telegram API Error')
+        mock_telebot.return_value = mock_bot_instance
+
+        feedback = self.create_feedback(answered=True, with_answer=True)
+        with self.assertLogs('core.models', level='ERROR'):
+            send_feedback_answer()
+
+        # a failed answer is retried by the next run
+        feedback.refresh_from_db()
+        self.assertIsNone(feedback.sent_at)
+        self.assertIsNone(feedback.send_claimed_at)
+
     def test_send_answer_not_answered(self):
         feedback = self.create_feedback(answered=False, with_answer=False)
 
@@ -299,6 +734,19 @@ class GetUserViewTest(GeneralTestMixin, APITestCase):
         self.assertEqual(response.data['id'], self.user.id)
         self.assertEqual(response.data['username'], self.user.username)
 
+    def test_get_user_not_modified(self):
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.user.total_score += 10
+        self.user.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
 
 class GetRatingViewTest(GeneralTestMixin, APITestCase):
     def setUp(self):
@@ -331,7 +779,9 @@ class GetRatingViewTest(GeneralTestMixin, APITestCase):
     def test_get_rating(self):
         self.client.force_authenticate(user=self.user)
 
-        response = self.client.get(self.url)
+        # Rating lookup, users aggregation and rating INSERT
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         self.assertEqual(len(response.data['data']), 1)
@@ -339,6 +789,16 @@ class GetRatingViewTest(GeneralTestMixin, APITestCase):
         self.assertEqual(response.data['data'][0]['score'], self.user.total_score)
         self.assertEqual(response.data['data'][0]['score_for_game'], self.user.total_score / self.user.games)
 
+    def test_get_rating_served_from_cache(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url)
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(self.url)
+
+        self.assertEqual(cached_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached_response.data, response.data)
+
     def test_update_rating_if_no_changes(self):
         """
         Testing rating updating if no changes in data. Rating should not be updated.
@@ -352,6 +812,8 @@ class GetRatingViewTest(GeneralTestMixin, APITestCase):
 
         with patch('core.models.now') as mock_now:
             mock_now.return_value = rating_old.updated_at + timedelta(seconds=60)
+            # the cached payload expires with the refresh window
+            cache.delete(RATING_CACHE_KEY)
             self.client.get(self.url)
             rating_new = Rating.objects.first()
             self.assertEqual(rating_old, rating_new)
@@ -370,34 +832,31 @@ class GetRatingViewTest(GeneralTestMixin, APITestCase):
         with patch('core.models.now') as mock_now:
             mock_now.return_value = rating_old.updated_at + timedelta(seconds=60)
 
-            # Creating additional user
-            TelegramUser.objects.create(
-                telegram_id='987654321',
-                chat_id=987654321,
-                games=10,
-                total_score=100.0
-            )
-            response = self.client.get(self.url)
+            # Creating additional users
+            self.bulk_make_users(20)
+            # the cached payload expires with the refresh window
+            cache.delete(RATING_CACHE_KEY)
+            # Rating lookup, users aggregation and the rating UPDATE in a savepoint, independent of the number of users
+            with self.assertNumQueries(5):
+                response = self.client.get(self.url)
             new_rating = Rating.objects.first()
 
             self.assertNotEqual(rating_old.data, new_rating.data)
-            self.assertEqual(len(response.data['data']), 2)
+            self.assertEqual(len(response.data['data']), 21)
 
 
 class GetLocationViewTest(GeneralTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+
+        cls.location_medium = cls.create_location(complexity='medium')
+        cls.location_hard = cls.create_location(complexity='hard')
+
     def setUp(self):
         super().setUp()
         self.url = reverse('get_location')
 
-        self.location_medium = Location.objects.create(
-            street_view_url = self.street_url,
-            complexity='medium'
-        )
-        self.location_hard = Location.objects.create(
-            street_view_url = self.street_url,
-            complexity='hard'
-        )
-
     def test_get_location_unauthorized(self):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -422,7 +881,9 @@ class GetLocationViewTest(GeneralTestMixin, APITestCase):
         self.user.games = 5
         self.user.save()
         self.client.force_authenticate(user=self.user)
-        response = self.client.get(self.url)
+        # Highest location id and the first candidate after the random pivot
+        with patch('core.models.random.randint', return_value=1), self.assertNumQueries(2):
+            response = self.client.get(self.url)
 
         # Receiving easy location
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -481,14 +942,19 @@ class SubmitGuessViewTest(GeneralTestMixin, APITestCase):
 
     def test_submit_guess_authorized(self):
         self.client.force_authenticate(user=self.user)
-        response = self.client.post(self.url, {
-            'location_id': self.location.id,
-            'guessed_lat': self.lat - 1.0,
-            'guessed_lng': self.lng - 1.0,
-            'duration': self.duration,
-            'moves_used': self.moves
-        })
+        # Location lookup, then the user UPDATE and game INSERT in a savepoint.
+        # Location stats are written by the on-commit task after the counted block.
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(5):
+            response = self.client.post(self.url, {
+                'location_id': self.location.id,
+                'guessed_lat': self.lat - 1.0,
+                'guessed_lng': self.lng - 1.0,
+                'duration': self.duration,
+                'moves_used': self.moves
+            })
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['updated_user_stats']['games'], 1)
+        self.assertEqual(response.data['updated_user_stats']['daily_moves_remaining'], DAILY_MOVES_LIMIT - self.moves)
 
         guess = GameResult.objects.first()
         self.assertEqual(guess.user, self.user)
@@ -527,11 +993,12 @@ class SendFeedbackAPIView(GeneralTestMixin, APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['message'], 'Feedback submitted successfully')
         self.assertEqual(Feedback.objects.count(), 1)
-        self.assertEqual(Feedback.objects.first().feedback_text, 'Test feedback')
-        self.assertEqual(Feedback.objects.first().user, self.user)
-        self.assertIsNone(Feedback.objects.first().answer)
-        self.assertIsNone(Feedback.objects.first().sent_at)
-        self.assertFalse(Feedback.objects.first().answered)
+        feedback = Feedback.objects.first()
+        self.assertEqual(feedback.feedback_text, 'Test feedback')
+        self.assertEqual(feedback.user_id, self.user.id)
+        self.assertIsNone(feedback.answer)
+        self.assertIsNone(feedback.sent_at)
+        self.assertFalse(feedback.answered)
 
     def test_send_feedback_invalid_data(self):
         self.client.force_authenticate(user=self.user)
@@ -1,14 +1,17 @@
+import hashlib
 import logging
 
-from django.db.models import Subquery
-from django.db.models.functions import Random
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
 from rest_framework import status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .mixins import AuthenticatedMixin
-from .models import GameResult, Location, Rating
+from .models import RATING_CACHE_KEY, RATING_UPDATING_THRESHOLD, GameResult, Location, Rating
 from .serializers import (
     FeedbackSerializer,
     GameResultSerializer,
@@ -19,6 +22,16 @@ from .serializers import (
 
 logger = logging.getLogger(__name__)
 
+
+def user_etag(request):
+    # The profile is already loaded by authentication, so the tag costs no queries
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    values = '|'.join(str(getattr(user, field)) for field in TelegramUserSerializer.Meta.fields)
+    return hashlib.blake2b(values.encode(), digest_size=16).hexdigest()
+
+
 class GetUserAPIView(AuthenticatedMixin, APIView):
     """
     Provides information about the authenticated user's profile.
@@ -28,13 +41,15 @@ class GetUserAPIView(AuthenticatedMixin, APIView):
         description="Retrieves and returns the authenticated user's data.",
         responses={
             200: TelegramUserSerializer,
+            304: OpenApiResponse(description="Profile has not changed since the given ETag"),
             401: OpenApiResponse(description="Error: unauthorized or expired token")
         }
     )
+    @method_decorator(condition(etag_func=user_etag))
     def get(self, request):
         user = self.get_user(request)
         serializer = TelegramUserSerializer(user)
-        logger.info(f'User {user} requested profile data')
+        logger.info('User %s requested profile data', user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -53,29 +68,35 @@ class GetRatingAPIView(AuthenticatedMixin, APIView):
     )
     def get(self, request):
         user = self.get_user(request)
+
+        # The rating is refreshed at most once per RATING_UPDATING_THRESHOLD, so the payload is shared until then
+        payload = cache.get(RATING_CACHE_KEY)
+        if payload is not None:
+            return Response(payload, status=status.HTTP_200_OK)
+
         rating = Rating.objects.first()
 
         if not rating:
-            # Creating an empty rating object if it doesn't exist
+            # Creating the rating object if it doesn't exist, it is fresh, so no update is needed
             try:
-                logger.info(f'Rating data was created by user {user}')
-                rating = Rating.objects.create(data=[])
-                rating.data = rating.create_rating_data()
-                rating.save()
+                logger.info('Rating data was created by user %s', user)
+                data = Rating.create_rating_data()
+                rating = Rating.objects.create(data=data, data_hash=Rating.hash_rating_data(data))
             except Exception as e:
-                logger.error(f'Error in rating data creation by user {user}: {e}')
+                logger.error('Error in rating data creation by user %s: %s', user, e)
                 return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            try:
+                # Updating existing rating data
+                rating.update_rating()
+                logger.info('Rating data was updated successfully by user %s', user)
 
-        try:
-            # Updating existing rating data
-            rating.update_rating()
-            logger.info(f'Rating data was updated successfully by user {user}')
-
-        except Exception as e:
-            logger.error(f'Error in rating data update by user {user}: {e}')
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            except Exception as e:
+                logger.error('Error in rating data update by user %s: %s', user, e)
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = RatingSerializer(rating)
+        cache.set(RATING_CACHE_KEY, serializer.data, RATING_UPDATING_THRESHOLD)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -95,21 +116,21 @@ class GetLocationAPIView(AuthenticatedMixin, APIView):
     def get(self, request):
         user = self.get_user(request)
 
-        guessed_location_ids = GameResult.objects.filter(user=user).values_list('location_id', flat=True)
-        location_queryset = Location.objects.exclude(id__in=Subquery(guessed_location_ids))
+        guessed = GameResult.objects.filter(user=user, location=OuterRef('pk'))
+        location_queryset = Location.objects.filter(~Exists(guessed), lat__isnull=False)
         if user.games <= 5:
             location_queryset = location_queryset.filter(complexity='easy')
-        location = location_queryset.order_by(Random()).first()
+        location = Location.pick_random(location_queryset)
 
         if not location:
-            logger.warning(f'No available locations found for user {user}')
+            logger.warning('No available locations found for user %s', user)
             return Response(
                 {"error": "No available locations found"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
         serializer = LocationSerializer(location)
-        logger.info(f'Location {location} was returned to user {user}')
+        logger.info('Location %s was returned to user %s', location, user)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -130,15 +151,13 @@ class SubmitGuessAPIView(AuthenticatedMixin, APIView):
     def post(self, request):
         # Ensure the user is authenticated before processing the request
         user = self.get_user(request)
-        data = request.data.copy()
-        data['user_id'] = request.user.id
-        serializer = GameResultSerializer(data=data)
+        serializer = GameResultSerializer(data=request.data)
 
         if serializer.is_valid():
-            guess = serializer.save()
-            logger.info(f'Guess {guess} was submitted by user {guess.user}')
+            guess = serializer.save(user=user)
+            logger.info('Guess %s was submitted by user %s', guess, guess.user)
 
-            user.refresh_from_db()
+            # GameResult.save() keeps the user's stats in sync in memory, so no re-fetch is needed
             user_serializer = TelegramUserSerializer(user)
             response_data = {
                 "message": "Guess submitted successfully",
@@ -151,7 +170,7 @@ class SubmitGuessAPIView(AuthenticatedMixin, APIView):
 
             return Response(response_data, status=status.HTTP_201_CREATED)
 
-        logger.warning(f'Error in guess submission by user {request.user}: {serializer.errors}')
+        logger.warning('Error in guess submission by user %s: %s', request.user, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -182,18 +201,16 @@ class SendFeedbackAPIView(AuthenticatedMixin, APIView):
         }
     )
     def post(self, request):
-        self.get_user(request)
-        data = request.data.copy()
-        data['user_id'] = request.user.id
-        serializer = FeedbackSerializer(data=data)
+        user = self.get_user(request)
+        serializer = FeedbackSerializer(data=request.data)
 
         if serializer.is_valid():
-            feedback = serializer.save()
-            logger.info(f'Feedback {feedback} was submitted by user {feedback.user}')
+            feedback = serializer.save(user=user)
+            logger.info('Feedback %s was submitted by user %s', feedback, feedback.user)
             return Response(
                 {"message": "Feedback submitted successfully"},
                 status=status.HTTP_201_CREATED
             )
 
-        logger.warning(f'Error in feedback submission by user {request.user}: {serializer.errors}')
+        logger.warning('Error in feedback submission by user %s: %s', request.user, serializer.errors)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,4 @@
+def post_fork(server, worker):
+    # Workers forked from a preloaded app need their own log listener thread
+    from core.apps import start_log_listener
+    start_log_listener()
@@ -5,7 +5,10 @@ from telebot.types import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 
 token = os.environ.get("TELEGRAM_TOKEN")
 url = os.environ.get("FRONT_URL")
-bot = telebot.TeleBot(token)
+webhook_url = os.environ.get("TELEGRAM_WEBHOOK_URL")
+webhook_secret = os.environ.get("TELEGRAM_WEBHOOK_SECRET")
+# Handlers run in the caller's thread, so a webhook request returns once its update is handled
+bot = telebot.TeleBot(token, threaded=False)
 
 @bot.message_handler(commands=['start'])
 def start(message):
@@ -17,4 +20,10 @@ def start(message):
     keyboard.add(button)
     bot.send_message(message.chat.id, "Click to open Mapster", reply_markup=keyboard)
 
-bot.polling()
+if __name__ == '__main__':
+    if webhook_url:
+        # Telegram pushes updates to users.views.telegram_webhook, no polling loop is needed
+        bot.remove_webhook()
+        bot.set_webhook(url=webhook_url, secret_token=webhook_secret)
+    else:
+        bot.polling()
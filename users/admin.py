@@ -1,11 +1,35 @@
 from django.contrib import admin
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, NullIf
 
 from .models import TelegramUser
 
 
+def per_game(field: str) -> Cast:
+    """
+    Divides a stats total by the number of games in SQL, NULL for users without games.
+    """
+    return Cast(field, FloatField()) / NullIf(F('games'), 0)
+
+
 @admin.register(TelegramUser)
 class TelegramUserAdmin(admin.ModelAdmin):
 
     list_display = [
         'id', 'username', 'total_score', 'telegram_id', 'games', 'avg_error', 'avg_time', 'total_time', 'total_errors'
     ]
+
+    def get_queryset(self, request):
+        # Averages are computed from the totals, so they are annotated to be sortable in the changelist
+        return super().get_queryset(request).annotate(
+            _avg_error=per_game('total_errors'),
+            _avg_time=per_game('total_time'),
+        )
+
+    @admin.display(description='Avg error', ordering='_avg_error')
+    def avg_error(self, obj):
+        return obj.avg_error
+
+    @admin.display(description='Avg time', ordering='_avg_time')
+    def avg_time(self, obj):
+        return obj.avg_time
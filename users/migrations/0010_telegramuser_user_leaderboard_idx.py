@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-15 22:04
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0009_telegramuser_chat_id'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='telegramuser',
+            index=models.Index(condition=models.Q(('games__gte', 5)), fields=['-total_score'], include=('username', 'games'), name='user_leaderboard_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_telegramuser_user_leaderboard_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='telegramuser',
+            name='avg_error',
+        ),
+        migrations.RemoveField(
+            model_name='telegramuser',
+            name='avg_moves_per_game',
+        ),
+        migrations.RemoveField(
+            model_name='telegramuser',
+            name='avg_time',
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-16 00:55
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('users', '0011_remove_telegramuser_avg_columns'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='telegramuser',
+            index=models.Index(fields=['last_move_date'], name='user_last_move_date_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-15 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_telegramuser_user_last_move_date_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='daily_moves_remaining',
+            field=models.PositiveSmallIntegerField(default=10),
+        ),
+    ]
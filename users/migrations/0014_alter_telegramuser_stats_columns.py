@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-16 02:40
+
+from django.db import migrations, models
+
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_alter_telegramuser_daily_moves_remaining'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='telegramuser',
+            managers=[
+                ('objects', users.models.TelegramUserManager()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='last_move_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='total_errors',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='total_score',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='telegramuser',
+            name='username',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -4,6 +4,7 @@ from django.utils import timezone
 
 # Constants
 DAILY_MOVES_LIMIT = 10
+RATING_MIN_GAMES = 5
 
 class TelegramUserManager(UserManager):
     def create_user(self, telegram_id, password=None, **extra_fields):
@@ -50,12 +51,9 @@ class TelegramUser(AbstractUser):
 
     # STATISTICS
     games = models.PositiveIntegerField(default=0)
-    daily_moves_remaining = models.PositiveIntegerField(default=DAILY_MOVES_LIMIT)
+    daily_moves_remaining = models.PositiveSmallIntegerField(default=DAILY_MOVES_LIMIT)
     last_move_date = models.DateField(null=True, blank=True)
 
-    avg_moves_per_game = models.PositiveIntegerField(default=0)
-    avg_error = models.FloatField(default=0)
-    avg_time = models.PositiveIntegerField(default=0)
     total_moves = models.PositiveIntegerField(default=0)
     total_time = models.PositiveIntegerField(default=0)
     total_errors = models.FloatField(default=0)
@@ -65,9 +63,34 @@ class TelegramUser(AbstractUser):
     REQUIRED_FIELDS = []
     objects = TelegramUserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Covers the leaderboard query with an ordered index-only scan
+            models.Index(
+                fields=['-total_score'],
+                name='user_leaderboard_idx',
+                condition=models.Q(games__gte=RATING_MIN_GAMES),
+                include=['username', 'games'],
+            ),
+            # Finds the users whose daily moves have to be reset
+            models.Index(fields=['last_move_date'], name='user_last_move_date_idx'),
+        ]
+
     def __str__(self):
         return self.username or str(self.telegram_id)
 
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.games if self.games else 0.0
+
+    @property
+    def avg_error(self) -> float:
+        return self.total_errors / self.games if self.games else 0.0
+
+    @property
+    def avg_moves_per_game(self) -> float:
+        return self.total_moves / self.games if self.games else 0.0
+
     def save(self, *args, **kwargs):
         if not self.username:
             self.username = str(self.telegram_id)
@@ -83,14 +106,5 @@ class TelegramUser(AbstractUser):
         self.total_moves += moves
         self.total_score += score
 
-        if self.games > 0:
-            self.avg_time = self.total_time / self.games
-            self.avg_error = self.total_errors / self.games
-            self.avg_moves_per_game = self.total_moves / self.games
-        else:
-            self.avg_time = 0
-            self.avg_error = 0.0
-            self.avg_moves_per_game = 0
-
         self.daily_moves_remaining -= moves
         self.last_move_date = timezone.now().date()
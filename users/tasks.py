@@ -7,22 +7,36 @@ from users.models import DAILY_MOVES_LIMIT, TelegramUser
 
 logger = logging.getLogger(__name__)
 
+# Users updated per UPDATE statement when resetting daily moves
+RESET_BATCH_SIZE = 5000
+
 @shared_task()
-def reset_daily_moves() -> None:
+def reset_daily_moves(batch_size: int = RESET_BATCH_SIZE) -> None:
     """
     Reset the daily moves for users who are behind the current date.
 
     The function identifies all Telegram users whose `last_move_date` is earlier
     than the current date and resets their `last_move_date` to the current date.
     It also updates their `daily_moves_remaining` to the predefined daily limit.
-    This function is processed asynchronously as a shared task, allowing for
-    background execution.
+    Users are updated in primary key batches, so every UPDATE stays short and
+    does not lock the whole table. This function is processed asynchronously
+    as a shared task, allowing for background execution.
     """
     today = now().date()
-    logger.info(f'Trying to reset daily moves for {today}')
-    updated_count = TelegramUser.objects.filter(last_move_date__lt=today).update(
-        last_move_date=today,
-        daily_moves_remaining=DAILY_MOVES_LIMIT
-    )
-    logger.info(f'Daily moves for {updated_count} users were reset and updated')
+    logger.info('Trying to reset daily moves for %s', today)
+    users = TelegramUser.objects.filter(last_move_date__lt=today).order_by('id')
+
+    updated_count = 0
+    last_id = 0
+    while True:
+        batch = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+
+        updated_count += TelegramUser.objects.filter(id__in=batch, last_move_date__lt=today).update(
+            last_move_date=today,
+            daily_moves_remaining=DAILY_MOVES_LIMIT
+        )
+        last_id = batch[-1]
 
+    logger.info('Daily moves for %s users were reset and updated', updated_count)
@@ -1,16 +1,21 @@
 import hashlib
 import hmac
 import json
+import time
+from datetime import timedelta
 from unittest.mock import patch
+from urllib.parse import parse_qsl
 
 from django.test import TestCase
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
 from users.models import DAILY_MOVES_LIMIT, TelegramUser
-from users.views import check_telegram_auth
+from users.tasks import reset_daily_moves
+from users.views import TELEGRAM_AUTH_TIMEOUT, check_telegram_auth
 
 
 class TelegramUserModelTest(TestCase):
@@ -69,6 +74,25 @@ class TelegramUserModelTest(TestCase):
         self.assertEqual(self.user.avg_error, self.user.total_errors / self.user.games)
         self.assertEqual(self.user.avg_moves_per_game, self.user.total_moves / self.user.games)
 
+class ResetDailyMovesTaskTest(TestCase):
+    """
+    Tests for reset_daily_moves task
+    """
+    def test_reset_daily_moves_in_batches(self):
+        today = timezone.now().date()
+        yesterday = today - timedelta(days=1)
+        for i in range(5):
+            TelegramUser.objects.create(telegram_id=str(i), last_move_date=yesterday, daily_moves_remaining=0)
+        active_user = TelegramUser.objects.create(telegram_id='5', last_move_date=today, daily_moves_remaining=3)
+
+        reset_daily_moves(batch_size=2)
+
+        reset_users = TelegramUser.objects.exclude(pk=active_user.pk)
+        self.assertEqual(reset_users.filter(last_move_date=today, daily_moves_remaining=DAILY_MOVES_LIMIT).count(), 5)
+        active_user.refresh_from_db()
+        self.assertEqual(active_user.daily_moves_remaining, 3)
+
+
 class CheckTelegramAuthTest(TestCase):
     """
     Tests for check_telegram_auth function
@@ -78,13 +102,43 @@ class CheckTelegramAuthTest(TestCase):
         """
         Test with valid data
         """
+        auth_date = int(time.time())
+        user_data = '{"id":123456789,"username":"testuser"}'
+        data_check_string = f'auth_date={auth_date}\nuser={user_data}'
+        secret_key = hmac.new(b'WebAppData', b'test_token', hashlib.sha256).digest()
+        computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        raw_init_data = f"auth_date={auth_date}&user={user_data}&hash={computed_hash}"
+        result = check_telegram_auth(raw_init_data)
+
+        self.assertEqual(result, {'auth_date': str(auth_date), 'user': user_data})
+
+    @patch('users.views.BOT_TOKEN', 'test_token')
+    def test_check_telegram_auth_missing_auth_date(self):
+        """
+        Test with valid hash of data without auth_date
+        """
         test_data = 'user={"id":123456789,"username":"testuser"}'
         secret_key = hmac.new(b'WebAppData', b'test_token', hashlib.sha256).digest()
         computed_hash = hmac.new(secret_key, test_data.encode(), hashlib.sha256).hexdigest()
         raw_init_data = f"{test_data}&hash={computed_hash}"
         result = check_telegram_auth(raw_init_data)
 
-        self.assertTrue(result)
+        self.assertIsNone(result)
+
+    @patch('users.views.BOT_TOKEN', 'test_token')
+    def test_check_telegram_auth_expired(self):
+        """
+        Test with valid hash of expired data
+        """
+        auth_date = int(time.time()) - TELEGRAM_AUTH_TIMEOUT - 1
+        user_data = '{"id":123456789,"username":"testuser"}'
+        data_check_string = f'auth_date={auth_date}\nuser={user_data}'
+        secret_key = hmac.new(b'WebAppData', b'test_token', hashlib.sha256).digest()
+        computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        raw_init_data = f"auth_date={auth_date}&user={user_data}&hash={computed_hash}"
+        result = check_telegram_auth(raw_init_data)
+
+        self.assertIsNone(result)
 
     def test_check_telegram_auth_missing_hash(self):
         """
@@ -93,7 +147,7 @@ class CheckTelegramAuthTest(TestCase):
         raw_init_data = 'user={"id":123456789,"username":"testuser"}'
         result = check_telegram_auth(raw_init_data)
 
-        self.assertFalse(result)
+        self.assertIsNone(result)
 
     @patch('users.views.BOT_TOKEN', 'test_token')
     def test_check_telegram_auth_invalid_hash(self):
@@ -103,7 +157,7 @@ class CheckTelegramAuthTest(TestCase):
         raw_init_data = 'user={"id":123456789,"username":"testuser"}&hash=invalid_hash'
         result = check_telegram_auth(raw_init_data)
 
-        self.assertFalse(result)
+        self.assertIsNone(result)
 
 class TelegramAuthViewTest(APITestCase):
     """
@@ -126,7 +180,7 @@ class TelegramAuthViewTest(APITestCase):
         """
         Test with invalid signature
         """
-        mock_check.return_value = False
+        mock_check.return_value = None
         response = self.client.post(self.url,{'initData':'test_data'})
 
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -137,18 +191,47 @@ class TelegramAuthViewTest(APITestCase):
         """
         Test with missing user data
         """
-        mock_check.return_value = True
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
         response = self.client.post(self.url,{'initData':'hash=valid_hash'})
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(response.json()['error'], 'User data is missing in initData')
 
+    @patch('users.views.check_telegram_auth')
+    def test_telegram_auth_invalid_user_data(self, mock_check):
+        """
+        Test with user data that is not a JSON object
+        """
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
+        for init_data in ('user=not_json&hash=valid_hash', 'user=[1]&hash=valid_hash'):
+            response = self.client.post(self.url, {'initData': init_data})
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json()['error'], 'Invalid user data format')
+
+    @patch('users.views.check_telegram_auth')
+    def test_telegram_auth_invalid_ids(self, mock_check):
+        """
+        Test with malformed user ID and chat ID
+        """
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
+        for init_data in (
+            'user={"id":"123456789"}&chatId=987654321&hash=valid_hash',
+            'user={"id":123456789}&chatId=chat&hash=valid_hash',
+            'user={"id":true}&chatId=987654321&hash=valid_hash',
+        ):
+            response = self.client.post(self.url, {'initData': init_data})
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json()['error'], 'Invalid user ID or chat ID')
+        self.assertFalse(TelegramUser.objects.exists())
+
     @patch('users.views.check_telegram_auth')
     def test_telegram_auth_new_user_creation(self, mock_check):
         """
         Test with new user creation
         """
-        mock_check.return_value = True
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
         user_data = json.dumps({
             "id": 123456789,
             "username": "testuser"
@@ -177,7 +260,7 @@ class TelegramAuthViewTest(APITestCase):
         """
         Test with existing user
         """
-        mock_check.return_value = True
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
 
         # Creating objects
         user = TelegramUser.objects.create(
@@ -191,9 +274,10 @@ class TelegramAuthViewTest(APITestCase):
             "username": "newusername"
         })
 
-        # Creating api call
+        # Creating api call: one SELECT of the user with its token and one UPDATE
         init_data = f'user={user_data}&chatId=987654321&hash=valid_hash'
-        response = self.client.post(self.url, {'initData': init_data})
+        with self.assertNumQueries(2):
+            response = self.client.post(self.url, {'initData': init_data})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # Refresh user data
@@ -211,7 +295,7 @@ class TelegramAuthViewTest(APITestCase):
         """
         Test with generating username
         """
-        mock_check.return_value = True
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
         user_data =  json.dumps({
             "id": 123456789
         })
@@ -229,7 +313,7 @@ class TelegramAuthViewTest(APITestCase):
         """
         Test with updating chat_id and username
         """
-        mock_check.return_value = True
+        mock_check.side_effect = lambda raw_init_data: dict(parse_qsl(raw_init_data))
 
         user = TelegramUser.objects.create(
             telegram_id = '123456789',
@@ -266,7 +350,8 @@ class TelegramUserIntegrationTest(APITestCase):
         }
         params = {
             "user": json.dumps(user_data),
-            "chatId": "987654321"
+            "chatId": "987654321",
+            "auth_date": str(int(time.time())),
         }
 
         # Creating a valid signature
@@ -298,3 +383,47 @@ class TelegramUserIntegrationTest(APITestCase):
         self.assertIn('user', response_data)
         self.assertEqual(response_data['user']['id'], user.id)
         self.assertEqual(response_data['user']['username'], user.username)
+
+
+class TelegramWebhookViewTest(TestCase):
+    """
+    Tests for telegram_webhook
+    """
+    def setUp(self):
+        self.url = reverse('telegram_webhook')
+
+    @patch('users.views.WEBHOOK_SECRET', 'test_secret')
+    @patch('users.views.get_webhook_bot')
+    def test_telegram_webhook_invalid_secret(self, mock_get_bot):
+        for secret_token in ('wrong_secret', 'sécret'):
+            response = self.client.post(
+                self.url, '{"update_id": 1}', content_type='application/json',
+                HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret_token,
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        mock_get_bot.assert_not_called()
+
+    @patch('users.views.WEBHOOK_SECRET', 'test_secret')
+    @patch('users.views.get_webhook_bot')
+    def test_telegram_webhook_processes_update(self, mock_get_bot):
+        response = self.client.post(
+            self.url, '{"update_id": 1}', content_type='application/json',
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN='test_secret',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        updates = mock_get_bot.return_value.process_new_updates.call_args.args[0]
+        self.assertEqual(updates[0].update_id, 1)
+
+    @patch('users.views.WEBHOOK_SECRET', 'test_secret')
+    @patch('users.views.get_webhook_bot')
+    def test_telegram_webhook_malformed_update(self, mock_get_bot):
+        for body in (b'{"update_id": ', b'\xff\xfe', b'{}', b'[]', b'null', b'1'):
+            response = self.client.post(
+                self.url, body, content_type='application/json',
+                HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN='test_secret',
+            )
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        mock_get_bot.assert_not_called()
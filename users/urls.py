@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     path("auth/telegram/", views.telegram_auth, name="telegram_auth"),
+    path("telegram/webhook/", views.telegram_webhook, name="telegram_webhook"),
 ]
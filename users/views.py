@@ -2,10 +2,15 @@ import hashlib
 import hmac
 import json
 import logging
+import time
+from functools import lru_cache
 from urllib.parse import parse_qsl
 
+import telebot
 from django.http import JsonResponse
 from django.utils.timezone import now
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from drf_spectacular.utils import extend_schema, OpenApiResponse, inline_serializer
 from rest_framework import status, serializers
 from rest_framework.authtoken.models import Token
@@ -21,8 +26,27 @@ from users.models import TelegramUser
 logger = logging.getLogger(__name__)
 
 BOT_TOKEN = env("TELEGRAM_TOKEN")
+WEBHOOK_SECRET = env("TELEGRAM_WEBHOOK_SECRET")
+TELEGRAM_AUTH_TIMEOUT = 24 * 60 * 60  # seconds initData stays valid after auth_date
 
-def check_telegram_auth(raw_init_data: str) -> bool:
+def get_webhook_bot() -> telebot.TeleBot:
+    """
+    Returns the bot with the registered message handlers, imported on the first webhook update.
+    """
+    from telegram_bot.main import bot
+    return bot
+
+@lru_cache(maxsize=1)
+def get_signer(bot_token: str) -> hmac.HMAC:
+    """
+    Returns an HMAC keyed with the web app data secret of the bot token, derived once per token.
+
+    The key pads are already hashed into its state, so copies of it only process the signed data.
+    """
+    secret_key = hmac.new(b'WebAppData', bot_token.encode(), hashlib.sha256).digest()
+    return hmac.new(secret_key, digestmod=hashlib.sha256)
+
+def check_telegram_auth(raw_init_data: str) -> dict | None:
     """
     Verifies the authentication of Telegram web app data by comparing the computed hash of the
     data with the hash received from Telegram. This ensures the data integrity and authenticity.
@@ -30,19 +54,108 @@ def check_telegram_auth(raw_init_data: str) -> bool:
     The function processes the raw initialization data by parsing key-value pairs, computes a
     hash using the HMAC algorithm with a secret key derived from the bot token, and compares it
     against an expected hash. If the computed hash matches the received hash, the data is
-    considered authentic.
+    considered authentic and its parsed parameters (without the hash) are returned.
     """
     params = dict(parse_qsl(raw_init_data, keep_blank_values=True))
     received_hash = params.pop('hash', None)
 
     if not received_hash:
-        return False
+        return None
+
+    # Missing or expired data is rejected before the signature is computed
+    auth_date = params.get('auth_date', '')
+    if not auth_date.isdigit() or int(auth_date) < time.time() - TELEGRAM_AUTH_TIMEOUT:
+        return None
+
+    try:
+        received_digest = bytes.fromhex(received_hash)
+    except ValueError:
+        return None
 
     data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(params.items()))
 
-    secret_key = hmac.new(b'WebAppData', BOT_TOKEN.encode(), hashlib.sha256).digest()
-    computed_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
-    return hmac.compare_digest(computed_hash, received_hash)
+    signer = get_signer(BOT_TOKEN).copy()
+    signer.update(data_check_string.encode())
+    computed_digest = signer.digest()
+    if not hmac.compare_digest(computed_digest, received_digest):
+        return None
+    return params
+
+def parse_telegram_user(params: dict) -> tuple[str, int | None, dict]:
+    """
+    Extracts the Telegram id, chat id and user data from verified initData parameters.
+
+    Both ids are checked before they reach the database, the Telegram id is returned as text
+    since it is stored in a CharField. Raises ValueError with the message returned to the
+    client when the data is missing or malformed.
+    """
+    user_data_raw = params.get("user")
+    if not user_data_raw:
+        logger.error("User data is missing in initData.")
+        raise ValueError("User data is missing in initData")
+
+    try:
+        user_data = json.loads(user_data_raw)
+    except json.JSONDecodeError:
+        user_data = None
+    if not isinstance(user_data, dict):
+        logger.error("Failed to decode user data JSON from initData: %s", user_data_raw)
+        raise ValueError("Invalid user data format")
+
+    telegram_id = user_data.get("id")
+    if not telegram_id:
+        logger.error("User ID is missing in user data from initData.")
+        raise ValueError("User ID missing in user data")
+
+    chat_id = params.get("chatId")
+    if not isinstance(telegram_id, int) or isinstance(telegram_id, bool):
+        logger.error("Invalid user ID or chat ID in initData: %s, %s", telegram_id, chat_id)
+        raise ValueError("Invalid user ID or chat ID")
+
+    if chat_id is not None:
+        try:
+            chat_id = int(chat_id)
+        except ValueError:
+            logger.error("Invalid user ID or chat ID in initData: %s, %s", telegram_id, chat_id)
+            raise ValueError("Invalid user ID or chat ID") from None
+
+    return str(telegram_id), chat_id, user_data
+
+def get_login_user(telegram_id: str, chat_id: int | None, username: str) -> tuple[TelegramUser, bool]:
+    """
+    Returns the user logging in and whether it was created by this login.
+    """
+    # Returning users are fetched together with their token in a single query
+    user = TelegramUser.objects.select_related('auth_token').filter(telegram_id=telegram_id).first()
+    if user is not None:
+        return user, False
+
+    user, created = TelegramUser.objects.get_or_create(
+        telegram_id=telegram_id,
+        defaults={
+            "username": username,
+            "chat_id": chat_id,
+        }
+    )
+    if created:
+        logger.info('Object was created: TelegramUser, telegram_id=%s, chat_id=%s username=%s', telegram_id, chat_id, username)
+    return user, created
+
+def get_auth_token(user: TelegramUser, created: bool) -> Token:
+    """
+    Returns the auth token of the user logging in, creating it on the first login.
+    """
+    # A new user cannot have a token yet, so it is created without a lookup
+    if created:
+        token, token_created = Token.objects.create(user=user), True
+    else:
+        # Already loaded with the user, unless a concurrent login has just created it
+        token, token_created = getattr(user, 'auth_token', None), False
+        if token is None:
+            token, token_created = Token.objects.get_or_create(user=user)
+    if token_created:
+        logger.info('New token was created for user: telegram_id=%s, username=%s', user.telegram_id, user.username)
+    return token
 
 @api_view(["POST"])
 @authentication_classes([])
@@ -97,54 +210,37 @@ def telegram_auth(request):
     raw_init_data = request.data.get("initData")
     if not raw_init_data:
         return JsonResponse({"error": "initData not provided"}, status=400)
-    if not check_telegram_auth(raw_init_data):
+    parsed_data = check_telegram_auth(raw_init_data)
+    if parsed_data is None:
         return JsonResponse({"error": "Invalid Telegram signature"}, status=403)
 
     try:
-        parsed_data = dict(parse_qsl(raw_init_data))
-        user_data_raw = parsed_data.get("user")
-
-        if not user_data_raw:
-             logger.error("User data is missing in initData.")
-             return JsonResponse({"error": "User data is missing in initData"}, status=400)
-
-        user_data = json.loads(user_data_raw)
-        telegram_id = user_data.get("id")
-
-        if not telegram_id:
-             logger.error("User ID is missing in user data from initData.")
-             return JsonResponse({"error": "User ID missing in user data"}, status=400)
+        telegram_id, chat_id, user_data = parse_telegram_user(parsed_data)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-        chat_id = parsed_data.get("chatId")
-        username = user_data.get("username", f"tg_{telegram_id}")
+    try:
+        username = user_data.get("username") or f"tg_{telegram_id}"
 
-        user, created = TelegramUser.objects.get_or_create(
-            telegram_id=telegram_id,
-            defaults={
-                "username": username,
-                "chat_id": chat_id,
-            }
-        )
-        if created:
-            logger.info(f'Object was created: TelegramUser, telegram_id={telegram_id}, chat_id={chat_id} username={username}')
+        user, created = get_login_user(telegram_id, chat_id, username)
 
+        # Changed fields are written together with last_login in a single UPDATE
+        update_fields = ["last_login"]
         if not created and user.username != username and not user.username.startswith("tg_"):
             user.username = username
-            user.save(update_fields=["username"])
-            logger.info(f'Object was updated: TelegramUser, telegram_id={telegram_id}, username={username}')
+            update_fields.append("username")
+            logger.info('Object was updated: TelegramUser, telegram_id=%s, username=%s', telegram_id, username)
 
         if not user.chat_id:
             user.chat_id = chat_id
-            user.save(update_fields=["chat_id"])
-            logger.info(f'Object was updated: TelegramUser, telegram_id={telegram_id}, chat_id={chat_id}')
+            update_fields.append("chat_id")
+            logger.info('Object was updated: TelegramUser, telegram_id=%s, chat_id=%s', telegram_id, chat_id)
 
-        token, token_created = Token.objects.get_or_create(user=user)
-        if token_created:
-            logger.info(f'New token was created for user: telegram_id={telegram_id}, username={username}')
+        token = get_auth_token(user, created)
 
         user.last_login = now()
-        user.save(update_fields=["last_login"])
-        logger.info(f'User was successfully logged in: telegram_id={telegram_id}, username={username}')
+        user.save(update_fields=update_fields)
+        logger.info('User was successfully logged in: telegram_id=%s, username=%s', telegram_id, username)
 
         return JsonResponse({
             "token": token.key,
@@ -154,10 +250,29 @@ def telegram_auth(request):
             }
         }, status=status.HTTP_200_OK)
 
-    except json.JSONDecodeError:
-        logger.error(f"Failed to decode user data JSON from initData: {user_data_raw}")
-        return JsonResponse({"error": "Invalid user data format"}, status=400)
-
     except Exception as e:
-        logger.exception(f"An unexpected error occurred during Telegram authentication: {e}")
+        logger.exception("An unexpected error occurred during Telegram authentication: %s", e)
         return JsonResponse({"error": "Internal server error"}, status=500)
+
+@csrf_exempt
+@require_POST
+def telegram_webhook(request):
+    """
+    Receives updates pushed by Telegram and passes them to the bot message handlers.
+
+    Requests are accepted only with the secret token the webhook was registered with.
+    """
+    secret_token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not WEBHOOK_SECRET or not hmac.compare_digest(secret_token.encode(), WEBHOOK_SECRET.encode()):
+        logger.warning('Telegram webhook update with an invalid secret token')
+        return JsonResponse({"error": "Invalid secret token"}, status=403)
+
+    try:
+        update = telebot.types.Update.de_json(request.body.decode())
+    except (ValueError, KeyError, TypeError):
+        # Answering 400 instead of 500 keeps Telegram from redelivering a malformed update
+        logger.warning('Telegram webhook update could not be decoded')
+        return JsonResponse({"error": "Invalid update"}, status=400)
+
+    get_webhook_bot().process_new_updates([update])
+    return JsonResponse({}, status=200)